@@ -0,0 +1,50 @@
+"""
+Benchmark plot evaluation backends for UML Calculator
+
+Times every available backend over a grid of expression sizes and point counts
+and reports where each backend starts to win.
+
+Usage: python benchmarks/bench_plot_backends.py [repeats]
+"""
+import sys
+import os
+import timeit
+
+import numpy as np
+import sympy
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.kernels import ExpressionKernel, NUMEXPR_AVAILABLE
+
+EXPRESSIONS = [
+    "x**2 - 4",
+    "3*x**3 - 5*x**2 + 2*x - 7",
+    "sin(x)*exp(-x**2/10) + cos(3*x)*x**2 - sqrt(x**2 + 1)",
+    "sin(x)**2 + cos(x)**2 + tan(x/7)*x**3 - exp(sin(x))*log(x**2 + 1) + x**5/120 - x**3/6",
+]
+POINT_COUNTS = [500, 5_000, 50_000, 500_000, 5_000_000]
+
+def run(repeats=3):
+    """Print timings per backend and the fastest backend per workload"""
+    x = sympy.symbols('x')
+    backends = ["numpy", "chunked"] + (["numexpr"] if NUMEXPR_AVAILABLE else [])
+    
+    print(f"{'ops':>4} {'points':>10} " + " ".join(f"{b:>10}" for b in backends) + f" {'fastest':>10} {'auto':>10}")
+    for expr_str in EXPRESSIONS:
+        kernel = ExpressionKernel(sympy.sympify(expr_str), x)
+        for points in POINT_COUNTS:
+            x_values = np.linspace(-10, 10, points)
+            timings = {}
+            for backend in backends:
+                kernel.evaluate(x_values, backend)  # warm up compilation
+                timings[backend] = min(timeit.repeat(
+                    lambda: kernel.evaluate(x_values, backend), number=1, repeat=repeats))
+            fastest = min(timings, key=timings.get)
+            print(f"{kernel.size:>4} {points:>10} "
+                  + " ".join(f"{timings[b] * 1000:>8.2f}ms" for b in backends)
+                  + f" {fastest:>10} {kernel.select_backend(points):>10}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
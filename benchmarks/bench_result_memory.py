@@ -0,0 +1,71 @@
+"""
+Benchmark per-row memory of batch results for UML Calculator
+
+Compares the previous dict-of-dicts result layout with ResultRecords stored in
+a ResultLog, measuring the bytes allocated per row with tracemalloc.
+
+Usage: python benchmarks/bench_result_memory.py [rows]
+"""
+import sys
+import os
+import tracemalloc
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.records import ResultLog, shared_fields
+
+FIELDS = ("operation", "expression", "a", "b")
+
+def make_rows(count):
+    """Build CSV-like row tuples mixing calc and ris operations"""
+    rows = []
+    for i in range(count):
+        if i % 2:
+            rows.append(("ris", "", str(i % 97), str(i % 13 + 1)))
+        else:
+            rows.append(("calc", f"{i % 50}*x + 3", "", ""))
+    return rows
+
+def dict_results(rows):
+    """Previous layout: one dict per row plus a copied inputs dict"""
+    results = []
+    for row in rows:
+        row = dict(zip(FIELDS, row))
+        results.append({
+            'operation': row['operation'],
+            'inputs': {k: v for k, v in row.items() if k != 'operation'},
+            'result': 1.0,
+            'status': 'success'
+        })
+    return results
+
+def record_results(rows):
+    """Compact layout: one ResultRecord per row sharing the row tuple"""
+    fields = shared_fields(FIELDS)
+    results = ResultLog()
+    for row in rows:
+        results.append(row[0], fields, row, 1.0, 'success')
+    return results
+
+def measure(build, rows):
+    """Return bytes allocated per row by build(rows)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return (after - before) / len(rows)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    
+    before = measure(dict_results, rows)
+    after = measure(record_results, rows)
+    
+    print(f"Rows: {count}")
+    print(f"dict of dicts:  {before:8.1f} bytes/row")
+    print(f"ResultRecord:   {after:8.1f} bytes/row")
+    print(f"Saving:         {before / after:8.1f}x")
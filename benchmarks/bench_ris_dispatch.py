@@ -0,0 +1,56 @@
+"""
+Benchmark RIS rule dispatch cost for UML Calculator
+
+Registers extra rules that never match ahead of the built-ins and times the
+scalar and vectorized dispatch per call, to show how cost grows with the
+number of rules. Rules given as expression strings are inlined into the
+compiled dispatch; rules given as functions cost one call each.
+
+Usage: python benchmarks/bench_ris_dispatch.py [calls]
+"""
+import sys
+import os
+import timeit
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.ris_community import ris, ris_vectorized, register_rule, unregister_rule
+
+RULE_COUNTS = [0, 5, 10, 20, 50]
+ARRAY_SIZE = 100_000
+
+def add_rules(count, inline):
+    """Register count rules that never match, checked before the built-ins"""
+    names = []
+    for i in range(count):
+        name = f"bench_{i}"
+        predicate = f"a == {-10**9 - i}" if inline else (lambda a, b, v=-10**9 - i: a == v)
+        register_rule(name, predicate, "a", mask=lambda a, b, v=-10**9 - i: a == v,
+                      vector_action=lambda a, b: a, priority=i)
+        names.append(name)
+    return names
+
+def run(calls=100_000):
+    """Print per-call dispatch cost for each rule count"""
+    a = np.random.default_rng(0).integers(-100, 100, ARRAY_SIZE)
+    b = np.random.default_rng(1).integers(-100, 100, ARRAY_SIZE)
+    
+    print(f"{'extra rules':>11} {'inline ns':>10} {'function ns':>12} {'vector ms':>10}")
+    for count in RULE_COUNTS:
+        timings = []
+        for inline in (True, False):
+            names = add_rules(count, inline)
+            ris(7, 4)  # compile outside the timed loop
+            # (7, 4) falls through to the default rule, the worst case
+            timings.append(timeit.timeit(lambda: ris(7, 4), number=calls) / calls * 1e9)
+            if inline:
+                vector = timeit.timeit(lambda: ris_vectorized(a, b), number=5) / 5 * 1e3
+            for name in names:
+                unregister_rule(name)
+        print(f"{count:>11} {timings[0]:>10.0f} {timings[1]:>12.0f} {vector:>10.2f}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,49 @@
+"""
+Benchmark parameterized templates for UML Calculator
+
+Compares solving and evaluating a coefficient family like a*x^2 + b*x + c row
+by row through core.symbolic with a single ExpressionTemplate call.
+
+Usage: python benchmarks/bench_templates.py [rows]
+"""
+import sys
+import os
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.symbolic import evaluate_expression, solve_equation
+from core.templates import ExpressionTemplate
+
+PER_ROW_SAMPLE = 200  # per-row solving is slow, so time a sample and scale up
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rows = np.round(np.random.default_rng(0).uniform(-10, 10, (count, 3)), 3)
+    sample = rows[:PER_ROW_SAMPLE]
+    
+    def solve_rows():
+        for a, b, c in sample:
+            solve_equation(f"{a}*x^2 + {b}*x + {c}")
+    
+    def evaluate_rows():
+        for a, b, c in sample:
+            evaluate_expression(f"{a}*x^2 + {b}*x + {c}", 1.5)
+    
+    template_compile = timed(lambda: ExpressionTemplate("a*x^2 + b*x + c").solve(rows[:1]))
+    template = ExpressionTemplate("a*x^2 + b*x + c")
+    template.solve(rows[:1])
+    
+    scale = count / len(sample)
+    print(f"Rows: {count}")
+    print(f"Template compile + first solve: {template_compile:8.3f}s")
+    print(f"Solve     per row (est.) {timed(solve_rows) * scale:8.3f}s   template {timed(lambda: template.solve(rows)):8.3f}s")
+    print(f"Evaluate  per row (est.) {timed(evaluate_rows) * scale:8.3f}s   template {timed(lambda: template.evaluate(rows, 1.5)):8.3f}s")
@@ -0,0 +1,71 @@
+"""
+Benchmark worker result transport for UML Calculator
+
+Compares returning results from worker processes by pickling them with
+writing them into a SharedResultBuffer, for RIS rows (many small numbers) and
+plot arrays (few large arrays). Evaluation is kept trivial so the numbers show
+transport cost.
+
+Usage: python benchmarks/bench_worker_transport.py [workers]
+"""
+import sys
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.ris_community import ris
+from core.shm_transport import SharedResultBuffer, attach_worker, chunk_ranges, worker_buffer
+
+RIS_ROWS = 2_000_000
+PLOT_ARRAYS = 400
+PLOT_POINTS = 100_000
+
+def ris_pickled(task):
+    start, stop = task
+    return [ris(i % 97 + 1, i % 13 + 1) for i in range(start, stop)]
+
+def ris_shared(task):
+    start, stop = task
+    worker_buffer().put_many(start, [ris(i % 97 + 1, i % 13 + 1) for i in range(start, stop)])
+    return stop - start
+
+def plot_pickled(task):
+    start, stop = task
+    x = np.linspace(-10, 10, PLOT_POINTS)
+    return [np.sin(x * i) for i in range(start, stop)]
+
+def plot_shared(task):
+    start, stop = task
+    buffer = worker_buffer()
+    x = np.linspace(-10, 10, PLOT_POINTS)
+    for i in range(start, stop):
+        buffer.put_array(i, np.sin(x * i), i * PLOT_POINTS)
+    return stop - start
+
+def time_pickled(function, count, workers):
+    started = time.perf_counter()
+    with Pool(workers) as pool:
+        for _ in pool.imap_unordered(function, chunk_ranges(count, workers, min_chunk=1)):
+            pass
+    return time.perf_counter() - started
+
+def time_shared(function, count, arena_size, workers):
+    started = time.perf_counter()
+    with SharedResultBuffer(count, arena_size) as buffer:
+        with Pool(workers, initializer=attach_worker, initargs=(buffer.name, count, arena_size)) as pool:
+            for _ in pool.imap_unordered(function, chunk_ranges(count, workers, min_chunk=1)):
+                pass
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    print(f"Workers: {workers}")
+    print(f"RIS rows ({RIS_ROWS:,}):     pickled {time_pickled(ris_pickled, RIS_ROWS, workers):6.2f}s"
+          f"  shared {time_shared(ris_shared, RIS_ROWS, 0, workers):6.2f}s")
+    print(f"Plot arrays ({PLOT_ARRAYS} x {PLOT_POINTS:,}): pickled {time_pickled(plot_pickled, PLOT_ARRAYS, workers):6.2f}s"
+          f"  shared {time_shared(plot_shared, PLOT_ARRAYS, PLOT_ARRAYS * PLOT_POINTS, workers):6.2f}s")
@@ -0,0 +1,119 @@
+"""
+Numeric evaluation backends for UML Calculator - Community Edition
+
+Compiles a parsed expression of one variable into array kernels and picks the
+cheapest backend for a workload:
+
+- numpy: plain ``sympy.lambdify`` kernel, best for small workloads
+- numexpr: multithreaded kernel with fewer temporaries (optional dependency)
+- chunked: numpy kernel applied block by block to bound temporary memory
+"""
+import numpy as np
+import sympy
+
+try:
+    # numexpr is optional - it is only used when installed
+    import numexpr  # noqa: F401
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+BACKENDS = ("auto", "numpy", "numexpr", "chunked")
+
+# Crossover points measured with benchmarks/bench_plot_backends.py
+NUMEXPR_MIN_WORK = 50_000  # points * operations before numexpr pays off
+CHUNKED_MIN_POINTS = 500_000  # point count where temporaries dominate
+CHUNK_SIZE = 1 << 16
+PROBE_POINTS = np.linspace(-1.0, 1.0, 8)
+
+class ExpressionKernel:
+    """Compiled array evaluators for a single-variable expression"""
+    
+    def __init__(self, expr, symbol):
+        self.expr = expr
+        self.symbol = symbol
+        self.size = int(sympy.count_ops(expr)) + 1
+        self._numpy = sympy.lambdify(symbol, expr, "numpy")
+        self._numexpr = None
+    
+    def select_backend(self, points):
+        """
+        Choose a backend from the expression size and point count
+        
+        Args:
+            points: Number of points that will be evaluated
+        
+        Returns:
+            Backend name
+        """
+        if NUMEXPR_AVAILABLE and points * self.size >= NUMEXPR_MIN_WORK:
+            return "numexpr"
+        if points >= CHUNKED_MIN_POINTS:
+            return "chunked"
+        return "numpy"
+    
+    def evaluate(self, x_values, backend="auto"):
+        """
+        Evaluate the expression over an array of x values
+        
+        Args:
+            x_values: 1-D numpy array of x values
+            backend: One of BACKENDS
+        
+        Returns:
+            Array of y values with the same shape as x_values
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Available backends: {', '.join(BACKENDS)}")
+        
+        if backend == "auto":
+            backend = self.select_backend(len(x_values))
+            if backend == "numexpr":
+                f = self._compile_numexpr()
+                if f is not None:
+                    try:
+                        return self._broadcast(f(x_values), x_values)
+                    except Exception:
+                        # numexpr rejected the kernel after all; never try it again
+                        self._numexpr = False
+                backend = "chunked" if len(x_values) >= CHUNKED_MIN_POINTS else "numpy"
+        
+        if backend == "numexpr":
+            f = self._compile_numexpr()
+            if f is None:
+                raise ValueError("numexpr backend is not available for this expression")
+            return self._broadcast(f(x_values), x_values)
+        
+        if backend == "chunked":
+            return self._evaluate_chunked(x_values)
+        
+        return self._broadcast(self._numpy(x_values), x_values)
+    
+    def _compile_numexpr(self):
+        """Compile the numexpr kernel on first use, or None if unsupported"""
+        if self._numexpr is None and NUMEXPR_AVAILABLE:
+            try:
+                self._numexpr = sympy.lambdify(self.symbol, self.expr, "numexpr")
+                # lambdify accepts functions like Max, sign and gamma that
+                # numexpr only rejects when called, so try the kernel once
+                self._numexpr(PROBE_POINTS)
+            except Exception:
+                # Expression uses functions numexpr cannot express
+                self._numexpr = False
+        return self._numexpr or None
+    
+    def _evaluate_chunked(self, x_values):
+        """Evaluate block by block into a preallocated output array"""
+        y_values = np.empty(len(x_values), dtype=float)
+        for start in range(0, len(x_values), CHUNK_SIZE):
+            block = x_values[start:start + CHUNK_SIZE]
+            y_values[start:start + CHUNK_SIZE] = self._broadcast(self._numpy(block), block)
+        return y_values
+    
+    @staticmethod
+    def _broadcast(y_values, x_values):
+        """Expand constant results to one value per x"""
+        y_values = np.asarray(y_values)
+        if y_values.shape != np.shape(x_values):
+            y_values = np.broadcast_to(y_values, np.shape(x_values))
+        return y_values
@@ -0,0 +1,317 @@
+"""
+Numeric equation solving for UML Calculator - Community Edition
+
+Finds the roots of f(x) = 0 without a full symbolic solve:
+
+- Polynomials with numeric coefficients use the eigenvalues of the companion
+  matrix (numpy.roots), which handles any degree.
+- Other functions are sampled on a vectorized grid to bracket sign changes, and
+  every bracket is then refined at once with a safeguarded Newton/bisection
+  iteration running in lockstep over numpy arrays. Functions whose derivative
+  cannot be evaluated numerically (such as Abs of a complex symbol) are
+  refined by bisection alone. Touching roots are polished from the minima of
+  |f| and kept only where both f and f' vanish to rounding level.
+"""
+import numpy as np
+import sympy
+
+from core.kernels import ExpressionKernel, PROBE_POINTS
+
+GRID_POINTS = 20001
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-12
+
+def solve_numeric(expr, x, x_min=-100, x_max=100, grid_points=GRID_POINTS):
+    """
+    Numerically solve expr = 0 for x
+    
+    Args:
+        expr: Parsed sympy expression
+        x: Symbol to solve for
+        x_min, x_max: Search range for non-polynomial functions
+        grid_points: Number of grid samples used to bracket roots
+    
+    Returns:
+        Sorted list of roots. Real roots are floats, complex polynomial roots
+        are strings such as "1.5 - 2*I".
+    """
+    if expr.free_symbols - {x}:
+        names = ", ".join(sorted(str(s) for s in expr.free_symbols - {x}))
+        raise ValueError(f"Numeric solving needs an expression in x only (found {names})")
+    
+    roots = polynomial_roots(expr, x)
+    if roots is not None:
+        return roots
+    
+    return function_roots(expr, x, x_min, x_max, grid_points)
+
+def polynomial_roots(expr, x):
+    """
+    Find every root of a polynomial from its companion matrix
+    
+    Args:
+        expr: Parsed sympy expression
+        x: Symbol to solve for
+    
+    Returns:
+        List of roots, or None if expr is not a polynomial with numeric coefficients
+    """
+    try:
+        poly = sympy.Poly(expr, x)
+    except sympy.PolynomialError:
+        return None
+    
+    if poly.degree() < 1 or not all(c.is_number for c in poly.all_coeffs()):
+        return None
+    
+    # Repeated roots are ill-conditioned, so split into square-free factors first
+    try:
+        factors = [factor for factor, _ in poly.sqf_list()[1]]
+    except Exception:
+        factors = [poly]
+    
+    real_roots, complex_roots = [], []
+    for factor in factors:
+        try:
+            coeffs = np.array([complex(c) for c in factor.all_coeffs()])
+        except TypeError:
+            return None
+        if not coeffs.imag.any():
+            coeffs = coeffs.real
+        
+        eigenvalues = np.roots(coeffs)
+        # Relative to the root itself, so x^2 + 1e-20 keeps its roots +-1e-10*I
+        real = np.abs(eigenvalues.imag) <= 1e-9 * np.abs(eigenvalues)
+        real_roots.extend(_polish_polynomial(coeffs, eigenvalues[real].real))
+        complex_roots.extend(eigenvalues[~real])
+    
+    real_roots = _dedupe(np.sort(np.array(real_roots, dtype=float)), 1e-9)
+    complex_roots = sorted(complex_roots, key=lambda z: (z.real, z.imag))
+    return [float(r) for r in real_roots] + _dedupe_complex(complex_roots)
+
+def function_roots(expr, x, x_min=-100, x_max=100, grid_points=GRID_POINTS):
+    """
+    Find the real roots of a smooth function inside [x_min, x_max]
+    
+    Args:
+        expr: Parsed sympy expression
+        x: Symbol to solve for
+        x_min, x_max: Search range
+        grid_points: Number of grid samples used to bracket roots
+    
+    Returns:
+        Sorted list of real roots as floats
+    """
+    f = ExpressionKernel(expr, x)
+    df = derivative_kernel(expr, x)
+    
+    with np.errstate(all="ignore"):
+        grid = np.linspace(x_min, x_max, grid_points)
+        values = _real(f.evaluate(grid))
+        
+        # Brackets: adjacent nonzero samples with opposite signs (a zero
+        # sample is an exact hit, and -0.0 next to 0.0 is not a sign change)
+        sign_change = np.signbit(values[:-1]) != np.signbit(values[1:])
+        sign_change &= np.isfinite(values[:-1]) & np.isfinite(values[1:])
+        sign_change &= (values[:-1] != 0) & (values[1:] != 0)
+        lo, hi = grid[:-1][sign_change], grid[1:][sign_change]
+        bracketed = refine_brackets(f, df, lo, hi)
+        
+        # Runs of zero or subnormal samples are underflow (exp(-x^2) far
+        # from 0), not roots
+        magnitude = np.abs(values)
+        tiny = magnitude < np.finfo(float).tiny
+        underflow = np.zeros(len(grid), dtype=bool)
+        underflow[1:] |= tiny[1:] & tiny[:-1]
+        underflow[:-1] |= tiny[:-1] & tiny[1:]
+        exact = grid[(values == 0) & ~underflow]
+        
+        # Discard poles and other false brackets
+        scale = 1 + np.nanmedian(magnitude) if np.isfinite(magnitude).any() else 1
+        residual = np.abs(_real(f.evaluate(bracketed)))
+        bracketed = bracketed[np.isfinite(residual) & (residual <= 1e-8 * scale)]
+        
+        # Touching roots do not change sign - polish local minima of |f|
+        minima = np.zeros(len(grid), dtype=bool)
+        minima[1:-1] = (magnitude[1:-1] <= magnitude[:-2]) & (magnitude[1:-1] <= magnitude[2:])
+        minima &= np.isfinite(magnitude) & ~underflow
+        touching = _touching_roots(f, df, grid, magnitude, minima)
+        
+        candidates = np.concatenate((exact, bracketed, touching))
+        candidates = candidates[(candidates >= x_min) & (candidates <= x_max)]
+        residual = np.abs(_real(f.evaluate(candidates)))
+        roots = _dedupe_by_residual(candidates, residual, 1e-8)
+    
+    return [float(r) for r in roots]
+
+def derivative_kernel(expr, x):
+    """
+    Compile the derivative of expr for Newton steps
+    
+    Args:
+        expr: Parsed sympy expression
+        x: Symbol to differentiate by
+    
+    Returns:
+        ExpressionKernel, or None if the derivative cannot be evaluated
+        numerically (for example Abs(x) differentiates to Derivative(re(x), x))
+    """
+    derivative = sympy.diff(expr, x)
+    if derivative.has(sympy.Derivative, sympy.Subs):
+        return None
+    try:
+        df = ExpressionKernel(derivative, x)
+        df.evaluate(PROBE_POINTS)
+    except Exception:
+        return None
+    return df
+
+def refine_brackets(f, df, lo, hi, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Refine many sign-change brackets at once
+    
+    Each iteration takes a Newton step from the current estimate of every
+    bracket and falls back to bisection when the step leaves the bracket.
+    
+    Args:
+        f, df: ExpressionKernels for the function and its derivative; df may
+            be None, in which case every step bisects
+        lo, hi: Arrays of bracket end points with f(lo) and f(hi) of opposite sign
+    
+    Returns:
+        Array of root estimates, one per bracket
+    """
+    lo, hi = lo.astype(float), hi.astype(float)
+    f_lo = _real(f.evaluate(lo))
+    estimate = (lo + hi) / 2
+    
+    for _ in range(max_iterations):
+        active = (hi - lo) > tolerance * (1 + np.abs(estimate))
+        if not active.any():
+            break
+        
+        value = _real(f.evaluate(estimate))
+        slope = _real(df.evaluate(estimate)) if df is not None else np.nan
+        
+        # Shrink the brackets around the current estimates
+        same_side = np.signbit(value) == np.signbit(f_lo)
+        lo = np.where(active & same_side, estimate, lo)
+        f_lo = np.where(active & same_side, value, f_lo)
+        hi = np.where(active & ~same_side, estimate, hi)
+        
+        # Take the Newton step when it stays inside the bracket, else bisect
+        newton = estimate - value / slope
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        step = np.where(inside, newton, (lo + hi) / 2)
+        
+        # Collapse brackets whose estimate is exact or no longer moving
+        done = (value == 0) | (inside & (np.abs(newton - estimate) <= tolerance * (1 + np.abs(estimate))))
+        estimate = np.where(active & ~(value == 0), step, estimate)
+        lo = np.where(active & done, estimate, lo)
+        hi = np.where(active & done, estimate, hi)
+    
+    return estimate
+
+def _touching_roots(f, df, grid, magnitude, minima, window=100):
+    """
+    Polish local minima of |f| and keep those that really touch zero
+    
+    A minimum is a root only if Newton drives |f| down to rounding level
+    relative to the size of f nearby and f' vanishes there too, so a curve
+    that merely comes close to zero (cos(x) + 1.000000001) is rejected.
+    
+    Args:
+        f, df: ExpressionKernels for the function and its derivative; without
+            df only exact zeros at the minima are accepted
+        grid, magnitude: Grid samples and |f| at each of them
+        minima: Boolean mask of the grid samples to polish
+        window: Grid samples on either side used for the local scale of f
+    
+    Returns:
+        Array of touching roots
+    """
+    index = np.flatnonzero(minima)
+    if df is None or len(index) == 0:
+        return grid[index[magnitude[index] == 0]]
+    
+    finite = np.where(np.isfinite(magnitude), magnitude, 0.0)
+    padded = np.pad(finite, window)
+    local_scale = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1)[index].max(axis=1)
+    slope_scale = np.nanmedian(np.abs(_real(df.evaluate(grid))))
+    
+    roots = _newton(f, df, grid[index])
+    residual = np.abs(_real(f.evaluate(roots)))
+    slope = np.abs(_real(df.evaluate(roots)))
+    flat = slope <= 1e-6 * (1 + slope_scale if np.isfinite(slope_scale) else 1)
+    return roots[(residual <= 1e-12 * local_scale) & flat]
+
+def _polish_polynomial(coeffs, roots, iterations=3):
+    """Improve real polynomial roots with a few Newton steps"""
+    if np.iscomplexobj(coeffs) or len(roots) == 0:
+        return roots
+    derivative = np.polyder(coeffs)
+    for _ in range(iterations):
+        slope = np.polyval(derivative, roots)
+        step = np.where(slope != 0, np.polyval(coeffs, roots) / np.where(slope != 0, slope, 1), 0.0)
+        roots = roots - step
+    return roots
+
+def _newton(f, df, starts, max_iterations=50):
+    """Run unguarded Newton iterations from many starting points at once"""
+    estimate = starts.astype(float)
+    for _ in range(max_iterations):
+        step = _real(f.evaluate(estimate)) / _real(df.evaluate(estimate))
+        step = np.where(np.isfinite(step), step, 0.0)
+        estimate = estimate - step
+        if (np.abs(step) <= TOLERANCE * (1 + np.abs(estimate))).all():
+            break
+    return estimate
+
+def _real(values):
+    """Treat complex function values as undefined"""
+    values = np.asarray(values)
+    if np.iscomplexobj(values):
+        return np.where(values.imag == 0, values.real, np.nan)
+    return values.astype(float)
+
+def _dedupe(sorted_roots, tolerance):
+    """Merge roots of a sorted array that lie within a relative tolerance"""
+    if len(sorted_roots) == 0:
+        return sorted_roots
+    size = np.maximum(np.abs(sorted_roots[:-1]), np.abs(sorted_roots[1:]))
+    gaps = np.diff(sorted_roots) > tolerance * size
+    return sorted_roots[np.concatenate(([True], gaps))]
+
+def _dedupe_by_residual(roots, residual, tolerance):
+    """
+    Merge nearby estimates of the same root, keeping the smallest residual
+    
+    An exact grid hit thus wins over a bracket that converged onto it from one
+    side. Returns the merged roots in ascending order.
+    """
+    if len(roots) == 0:
+        return roots
+    order = np.argsort(roots)
+    roots, residual = roots[order], residual[order]
+    group = np.concatenate(([0], np.cumsum(np.diff(roots) > tolerance * (1 + np.abs(roots[1:])))))
+    best = np.lexsort((residual, group))
+    first = np.concatenate(([True], np.diff(group[best]) > 0))
+    return roots[best][first]
+
+def _dedupe_complex(roots, tolerance=1e-6):
+    """Merge nearly equal complex roots and format them as strings"""
+    unique = []
+    for root in roots:
+        if not any(abs(root - other) <= tolerance * max(abs(root), abs(other)) for other in unique):
+            unique.append(root)
+    return [_format_complex(root) for root in unique]
+
+def _format_complex(z):
+    """Format a complex root the way SymPy prints solutions, e.g. "1.5 - 2*I" """
+    real = float(f"{z.real:.12g}")
+    imag = float(f"{z.imag:.12g}")
+    imag_str = "I" if abs(imag) == 1 else f"{abs(imag):.12g}*I"
+    if abs(real) <= 1e-12 * (1 + abs(imag)):
+        return f"-{imag_str}" if imag < 0 else imag_str
+    sign = "-" if imag < 0 else "+"
+    return f"{real:.12g} {sign} {imag_str}"
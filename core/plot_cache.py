@@ -0,0 +1,206 @@
+"""
+Incremental plot sampling for UML Calculator - Community Edition
+
+Keeps the (x, y) samples already evaluated for each expression so that zooming
+or panning only evaluates the parts of the new range that are not covered yet.
+With a cache directory the samples are also saved to disk, so separate
+`calculator.py plot` runs reuse each other's work.
+"""
+import hashlib
+import math
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from core.symbolic import canonicalize_expression, compile_plot_kernel, evaluate_plot_kernel
+
+class _SampleSet:
+    """Sorted samples and covered intervals for one expression"""
+    
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.intervals = []  # (lo, hi, step) ranges sampled at least every step
+        self.path = None  # sample file in the store's cache directory
+    
+    def uncovered(self, x_min, x_max, step):
+        """Return the parts of [x_min, x_max] not sampled at least every step"""
+        covered = sorted(
+            (max(lo, x_min), min(hi, x_max))
+            for lo, hi, interval_step in self.intervals
+            if interval_step <= step * (1 + 1e-9) and hi > x_min and lo < x_max
+        )
+        
+        gaps = []
+        position = x_min
+        for lo, hi in covered:
+            if lo > position:
+                gaps.append((position, lo))
+            position = max(position, hi)
+        if position < x_max:
+            gaps.append((position, x_max))
+        return gaps
+    
+    def add(self, x_values, y_values, step):
+        """Merge newly evaluated samples into the sorted store"""
+        self.intervals.append((x_values[0], x_values[-1], step))
+        
+        x_all = np.concatenate((self.x, x_values))
+        y_all = np.concatenate((self.y, y_values))
+        order = np.argsort(x_all, kind="stable")
+        x_all, y_all = x_all[order], y_all[order]
+        
+        # Gap endpoints coincide with existing samples - keep one of each
+        keep = np.ones(len(x_all), dtype=bool)
+        keep[1:] = x_all[1:] != x_all[:-1]
+        self.x, self.y = x_all[keep], y_all[keep]
+    
+    def window(self, x_min, x_max):
+        """Return the stored samples inside [x_min, x_max]"""
+        start = np.searchsorted(self.x, x_min, side="left")
+        stop = np.searchsorted(self.x, x_max, side="right")
+        return self.x[start:stop], self.y[start:stop]
+
+class PlotSampleStore:
+    """
+    Per-expression store of previously evaluated plot samples
+    
+    Args:
+        max_expressions: Expressions kept in memory, and sample files kept
+            in the cache directory
+        max_samples: Samples kept per expression before it is trimmed to the
+            requested window
+        cache_dir: Optional directory to persist samples in, keyed by
+            canonical expression and backend
+    """
+    
+    def __init__(self, max_expressions=32, max_samples=1_000_000, cache_dir=None):
+        self.max_expressions = max_expressions
+        self.max_samples = max_samples
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._keys = {}
+        self.evaluated_points = 0
+    
+    def sample(self, expr_str, x_min=-10, x_max=10, points=500, backend="auto"):
+        """
+        Generate x,y values for plotting, reusing cached samples
+        
+        Args:
+            expr_str: String expression in terms of x
+            x_min, x_max: Range for x values
+            points: Minimum number of points across the range
+            backend: Evaluation backend - "auto", "numpy", "numexpr" or "chunked"
+        
+        Returns:
+            (x_values, y_values) as numpy arrays. Where cached samples are denser
+            than requested they are all returned, so there may be more points
+            than requested.
+        """
+        try:
+            entry = self._entry(expr_str, backend)
+        except Exception as e:
+            raise ValueError(f"Error processing expression: {str(e)}")
+        
+        if points < 2 or x_max <= x_min:
+            # Degenerate ranges are cheap and not worth caching
+            x_values = np.linspace(x_min, x_max, points)
+            return x_values, evaluate_plot_kernel(entry.kernel, x_values, backend)
+        
+        step = (x_max - x_min) / (points - 1)
+        gaps = entry.uncovered(x_min, x_max, step)
+        for lo, hi in gaps:
+            count = max(2, math.ceil((hi - lo) / step) + 1)
+            x_values = np.linspace(lo, hi, count)
+            entry.add(x_values, evaluate_plot_kernel(entry.kernel, x_values, backend), step)
+            self.evaluated_points += count
+        
+        if len(entry.x) > self.max_samples:
+            # Keep only the requested window once an expression grows too large
+            x_values, y_values = entry.window(x_min, x_max)
+            entry.x, entry.y = x_values.copy(), y_values.copy()
+            entry.intervals = [(x_min, x_max, step)]
+        
+        if gaps and self.cache_dir:
+            self._save(entry)
+        
+        return entry.window(x_min, x_max)
+    
+    def clear(self):
+        """Drop every cached sample"""
+        self._entries.clear()
+        self._keys.clear()
+        self.evaluated_points = 0
+    
+    def _entry(self, expr_str, backend):
+        """Find or create the sample set for an expression"""
+        canonical = self._keys.get(expr_str)
+        if canonical is None:
+            canonical = canonicalize_expression(expr_str)
+            self._keys[expr_str] = canonical
+        
+        key = (canonical, backend)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _SampleSet(compile_plot_kernel(expr_str))
+            entry.path = self._cache_path(key)
+            if entry.path:
+                self._load(entry)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_expressions:
+                # Evict the least recently used expression
+                self._entries.popitem(last=False)
+                live = {canonical for canonical, _ in self._entries}
+                self._keys = {k: v for k, v in self._keys.items() if v in live}
+        else:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def _cache_path(self, key):
+        """Sample file for a (canonical expression, backend) key, or None"""
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"samples_{digest}.npz")
+    
+    def _load(self, entry):
+        """Fill a new sample set from its file, if an earlier run saved one"""
+        try:
+            with np.load(entry.path) as saved:
+                entry.x, entry.y = saved["x"], saved["y"]
+                entry.intervals = [tuple(interval) for interval in saved["intervals"].tolist()]
+        except (OSError, KeyError, ValueError):
+            # Missing or unreadable files just mean starting from scratch
+            pass
+    
+    def _save(self, entry):
+        """Write a sample set to its file and drop the oldest extra files"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a private file and rename, so concurrent runs never read
+        # a half-written file
+        handle, partial_file = tempfile.mkstemp(suffix=".npz", dir=self.cache_dir)
+        with os.fdopen(handle, "wb") as f:
+            np.savez(f, x=entry.x, y=entry.y, intervals=np.array(entry.intervals, dtype=float).reshape(-1, 3))
+        os.replace(partial_file, entry.path)
+        
+        saved = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if name.startswith("samples_") and name.endswith(".npz")
+        ]
+        if len(saved) > self.max_expressions:
+            saved.sort(key=_modified_time)
+            for path in saved[:len(saved) - self.max_expressions]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+def _modified_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
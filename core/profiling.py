@@ -0,0 +1,246 @@
+"""
+Hot-path profiling for UML Calculator - Community Edition
+
+Profiler runs a block of work under a low-overhead sampling profiler, or under
+cProfile with the sampler alongside, and writes two reports:
+
+- <prefix>.txt: time per core function (parse_expr, sympy.solve, float
+  conversion, CSV parsing, JSON output, ...) followed by the hottest functions
+- <prefix>.collapsed: one "frame;frame;frame count" line per stack, readable
+  by flamegraph.pl, speedscope and similar tools
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = ("sampling", "cprofile")
+DEFAULT_INTERVAL = 0.005
+
+# Report labels for the functions that dominate calculator workloads:
+# label -> list of (path suffix, function name or None for the whole module)
+HOT_PATHS = {
+    "parse_expr": [("sympy/parsing/sympy_parser.py", "parse_expr")],
+    "sympy.solve": [("sympy/solvers/solvers.py", "solve")],
+    "float() conversion": [("sympy/core/expr.py", "__float__")],
+    "lambdify / array kernels": [("sympy/utilities/lambdify.py", "lambdify"), ("core/kernels.py", None)],
+    "numeric solver": [("core/numeric_solver.py", None)],
+    "RIS": [("core/ris_community.py", None), ("core/ris_reduce.py", None)],
+    "csv parsing": [("csv.py", None), ("process_batch.py", "read_batch_rows")],
+    "json.dump": [("json/__init__.py", "dump"), ("json/encoder.py", None)],
+}
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _short_path(path):
+    """Shorten a source path for frame names"""
+    path = path.replace("\\", "/")
+    for marker in ("site-packages/", "/lib/python"):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            return path.split("/", 1)[1] if marker == "/lib/python" and "/" in path else path
+    root = _PROJECT_ROOT.replace("\\", "/") + "/"
+    return path[len(root):] if path.startswith(root) else path
+
+def _hot_labels(path, function):
+    """Return the HOT_PATHS labels a function belongs to"""
+    path = path.replace("\\", "/")
+    return [
+        label for label, patterns in HOT_PATHS.items()
+        if any(path.endswith(suffix) and name in (None, function) for suffix, name in patterns)
+    ]
+
+class StackSampler:
+    """
+    Periodically sample the call stack of one thread
+    
+    The sampler thread needs the GIL to take a sample, so under contention it
+    falls behind the nominal interval; achieved_interval reports the real one.
+    """
+    
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampled_seconds = 0.0
+        self._frame_names = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+    
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="uml-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._started is not None:
+            self.sampled_seconds = time.perf_counter() - self._started
+    
+    @property
+    def achieved_interval(self):
+        """Mean seconds between samples actually taken"""
+        return self.sampled_seconds / self.samples if self.samples else self.interval
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+    
+    def _frame_name(self, code):
+        """Cache one display name per code object"""
+        name = self._frame_names.get(code)
+        if name is None:
+            name = self._frame_names[code] = (
+                f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})",
+                code.co_filename,
+                code.co_name,
+            )
+        return name
+
+class Profiler:
+    """
+    Profile a block of work and write text and collapsed-stack reports
+    
+    Args:
+        output_prefix: Path prefix for <prefix>.txt and <prefix>.collapsed
+        mode: "sampling" (low overhead) or "cprofile" (exact call counts)
+        interval: Seconds between stack samples
+    """
+    
+    def __init__(self, output_prefix="profile", mode="sampling", interval=DEFAULT_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}. Available modes: {', '.join(PROFILE_MODES)}")
+        self.output_prefix = output_prefix
+        self.mode = mode
+        self.sampler = StackSampler(interval)
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.elapsed = 0.0
+        self._started = None
+    
+    def start(self):
+        self._started = time.perf_counter()
+        self.sampler.start()
+        if self.profile:
+            self.profile.enable()
+        return self
+    
+    def stop(self):
+        """Stop profiling and write the reports"""
+        if self.profile:
+            self.profile.disable()
+        self.sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+        return self.write_reports()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+    
+    def hot_path_summary(self):
+        """
+        Aggregate time per core function
+        
+        Returns:
+            List of (label, seconds, percent) sorted by time
+        """
+        seconds = Counter()
+        if self.profile:
+            # cProfile gives exact inclusive time per function
+            for (path, _, function), (_, _, _, cumulative, _) in pstats.Stats(self.profile).stats.items():
+                for label in _hot_labels(path, function):
+                    seconds[label] = max(seconds[label], cumulative)
+        else:
+            # A sample counts once per label however deep the label recurses
+            samples = Counter()
+            for stack, count in self.sampler.stacks.items():
+                labels = set()
+                for _, path, function in stack:
+                    labels.update(_hot_labels(path, function))
+                for label in labels:
+                    samples[label] += count
+            # Scale the share of samples to wall time: the sampler rarely
+            # keeps its nominal interval, so count * interval under-reports
+            for label, count in samples.items():
+                seconds[label] = self.elapsed * count / self.sampler.samples
+        
+        total = self.elapsed or 1.0
+        return [(label, seconds[label], 100.0 * seconds[label] / total) for label in HOT_PATHS if seconds[label]]
+    
+    def collapsed_stacks(self):
+        """Return collapsed-stack lines for flame-graph tools"""
+        return [
+            ";".join(name.replace(";", ":") for name, _, _ in stack) + f" {count}"
+            for stack, count in sorted(self.sampler.stacks.items())
+        ]
+    
+    def text_report(self, limit=25):
+        """Build the sorted text report"""
+        out = io.StringIO()
+        out.write(f"UML Calculator profile ({self.mode} mode)\n")
+        out.write(f"Wall time: {self.elapsed:.3f}s, samples: {self.sampler.samples} "
+                  f"every {self.sampler.achieved_interval * 1000:.1f}ms "
+                  f"(requested {self.sampler.interval * 1000:.1f}ms)\n\n")
+        
+        out.write("Time per core function\n")
+        summary = self.hot_path_summary()
+        if summary:
+            for label, seconds, percent in sorted(summary, key=lambda item: -item[1]):
+                out.write(f"  {label:<26} {seconds:9.3f}s {percent:6.1f}%\n")
+        else:
+            out.write("  (no samples in core functions)\n")
+        
+        if self.profile:
+            out.write("\ncProfile, sorted by cumulative time\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(limit)
+        else:
+            own, total = Counter(), Counter()
+            for stack, count in self.sampler.stacks.items():
+                own[stack[-1][0]] += count
+                for name in {name for name, _, _ in stack}:
+                    total[name] += count
+            samples = self.sampler.samples or 1
+            
+            out.write("\nHottest functions by own time\n")
+            for name, count in own.most_common(limit):
+                out.write(f"  {100.0 * count / samples:6.1f}% {name}\n")
+            out.write("\nHottest functions by total time\n")
+            for name, count in total.most_common(limit):
+                out.write(f"  {100.0 * count / samples:6.1f}% {name}\n")
+        
+        return out.getvalue()
+    
+    def write_reports(self):
+        """
+        Write <prefix>.txt and <prefix>.collapsed
+        
+        Returns:
+            (text report path, collapsed stacks path)
+        """
+        text_path = f"{self.output_prefix}.txt"
+        collapsed_path = f"{self.output_prefix}.collapsed"
+        with open(text_path, "w") as f:
+            f.write(self.text_report())
+        with open(collapsed_path, "w") as f:
+            f.write("\n".join(self.collapsed_stacks()) + "\n")
+        return text_path, collapsed_path
@@ -0,0 +1,250 @@
+"""
+Batch progress reporting and throughput telemetry for UML Calculator
+
+BatchTelemetry records the latency of every row with a few cheap operations
+and only looks at the clock every few rows, so it can stay on for runs of
+hundreds of thousands of rows per second. How many rows it waits adapts to the
+observed row rate, and a heartbeat thread keeps reporting while a single slow
+row runs. Snapshots are handed to a reporter: a Rich progress bar for
+terminals or JSON status lines otherwise.
+"""
+import heapq
+import json
+import sys
+import threading
+import time
+from array import array
+
+PERCENTILES = (50, 90, 99)
+
+class BatchTelemetry:
+    """
+    Collect per-row latency and throughput for a batch run
+    
+    Args:
+        total: Number of rows in the batch
+        reporter: Optional reporter with start, update and finish methods
+        interval: Seconds between status updates
+        window: Number of recent latencies per operation used for percentiles
+        slowest: Number of slowest rows to keep
+        check_every: Most rows between clock checks; fewer when rows are slow
+        heartbeat: Report from a background thread when no row finishes for
+            a whole interval (ignored when interval is 0)
+    """
+    
+    def __init__(self, total, reporter=None, interval=1.0, window=4096, slowest=5, check_every=256,
+                 heartbeat=True):
+        self.total = total
+        self.reporter = reporter
+        self.interval = interval
+        self.window = window
+        self.slowest_count = slowest
+        self.check_every = check_every
+        self.rows = 0
+        self.latencies = {}
+        self.slowest = []  # min-heap of (seconds, index, operation)
+        self._slowest_floor = 0.0
+        self._started = None
+        self._next_report = None
+        self._countdown = check_every
+        self._progress_at = None  # when rows were last seen to advance
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._stopped = threading.Event()
+        self.heartbeat = heartbeat
+        self.summary = None
+    
+    def start(self):
+        """Start the clock and show the initial status"""
+        self._started = self._progress_at = time.perf_counter()
+        self._next_report = self._started + self.interval
+        self._countdown = 1  # the first row measures the row rate
+        if self.reporter:
+            self.reporter.start(self)
+            if self.heartbeat and self.interval > 0:
+                self._stopped.clear()
+                self._heartbeat = threading.Thread(target=self._beat, name="batch-telemetry", daemon=True)
+                self._heartbeat.start()
+    
+    def record(self, index, operation, seconds):
+        """
+        Record the latency of one row
+        
+        Args:
+            index: Row index in the batch
+            operation: Operation name of the row
+            seconds: Time spent on the row
+        """
+        self.rows += 1
+        samples = self.latencies.get(operation)
+        if samples is None:
+            samples = self.latencies[operation] = array('d')
+        samples.append(seconds)
+        
+        if seconds > self._slowest_floor:
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, (seconds, index, operation))
+            else:
+                heapq.heappushpop(self.slowest, (seconds, index, operation))
+            if len(self.slowest) == self.slowest_count:
+                self._slowest_floor = self.slowest[0][0]
+        
+        # Only look at the clock every few rows
+        self._countdown -= 1
+        if self._countdown <= 0:
+            now = time.perf_counter()
+            self._progress_at = now
+            self._countdown = self._rows_per_check(now)
+            if self.reporter and now >= self._next_report:
+                self._report(now)
+    
+    def finish(self):
+        """Stop reporting and return the final summary"""
+        self.stop()
+        self.summary = self.snapshot(full=True)
+        if self.reporter:
+            self.reporter.finish(self.summary)
+        return self.summary
+    
+    def stop(self):
+        """Stop the heartbeat thread, e.g. when a run is aborted"""
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+    
+    def _rows_per_check(self, now):
+        """Rows until the next clock check: about four checks per interval"""
+        elapsed = now - self._started
+        if self.interval <= 0 or elapsed <= 0:
+            return self.check_every
+        return max(1, min(self.check_every, int(self.rows / elapsed * self.interval / 4)))
+    
+    def _report(self, now):
+        """Send a snapshot unless another thread just did"""
+        with self._lock:
+            if now < self._next_report or self._stopped.is_set():
+                return
+            self._next_report = now + self.interval
+            self.reporter.update(self.snapshot(now))
+    
+    def _beat(self):
+        """Heartbeat thread: report even while one row takes many intervals"""
+        seen_rows = self.rows
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            if self.rows != seen_rows:
+                seen_rows = self.rows
+                self._progress_at = max(self._progress_at, now - self.interval)
+            if now >= self._next_report:
+                self._report(now)
+    
+    def snapshot(self, now=None, full=False):
+        """
+        Build a status snapshot
+        
+        Args:
+            now: Current perf_counter value
+            full: Use every recorded latency instead of the recent window
+        
+        Returns:
+            Dict with throughput, ETA, latency percentiles and slowest rows
+        """
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._started if self._started is not None else 0.0
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.rows, 0)
+        stalled = now - self._progress_at if self._progress_at is not None and not full else 0.0
+        
+        latency = {}
+        # Copy the registry first: the heartbeat thread snapshots while rows are recorded
+        for operation, samples in list(self.latencies.items()):
+            recent = sorted(samples if full else samples[-self.window:])
+            latency[operation] = {
+                f"p{p}_ms": round(recent[min(len(recent) - 1, len(recent) * p // 100)] * 1000, 3)
+                for p in PERCENTILES
+            }
+            latency[operation]["count"] = len(samples)
+        
+        return {
+            "rows": self.rows,
+            "total": self.total,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(rate, 1),
+            "eta_s": round(remaining / rate, 1) if rate > 0 else None,
+            "stalled_s": round(max(stalled, 0.0), 3),
+            "latency": latency,
+            "slowest": [
+                {"row": index, "operation": operation, "ms": round(seconds * 1000, 3)}
+                for seconds, index, operation in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+class JsonStatusReporter:
+    """Write periodic machine-readable JSON status lines"""
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+    
+    def start(self, telemetry):
+        self._write("start", {"total": telemetry.total})
+    
+    def update(self, snapshot):
+        self._write("progress", snapshot)
+    
+    def finish(self, summary):
+        self._write("done", summary)
+    
+    def _write(self, event, payload):
+        self.stream.write(json.dumps({"event": event, **payload}) + "\n")
+        self.stream.flush()
+
+class RichProgressReporter:
+    """Show a live Rich progress bar with throughput and ETA"""
+    
+    def __init__(self, console=None):
+        from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn
+        self.progress = Progress(
+            TextColumn("[bold blue]Batch"),
+            BarColumn(),
+            TextColumn("{task.completed}/{task.total}"),
+            TextColumn("{task.fields[rate]:>10} rows/s"),
+            TimeRemainingColumn(),
+            TextColumn("{task.fields[latency]}"),
+            console=console,
+        )
+        self.task = None
+    
+    def start(self, telemetry):
+        self.progress.start()
+        self.task = self.progress.add_task("batch", total=telemetry.total, rate="-", latency="")
+    
+    def update(self, snapshot):
+        self.progress.update(
+            self.task,
+            completed=snapshot["rows"],
+            rate=f"{snapshot['rows_per_s']:,.0f}",
+            latency=_format_latency(snapshot["latency"], snapshot.get("stalled_s", 0.0)),
+        )
+    
+    def finish(self, summary):
+        self.update(summary)
+        self.progress.stop()
+
+def default_reporter(stream=None):
+    """Pick a Rich progress bar for terminals and JSON status lines otherwise"""
+    stream = stream or sys.stderr
+    if stream.isatty():
+        from rich.console import Console
+        return RichProgressReporter(Console(file=stream))
+    return JsonStatusReporter(stream)
+
+def _format_latency(latency, stalled=0.0):
+    """Format p50/p99 latency per operation for the progress bar"""
+    text = " ".join(
+        f"{operation} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms"
+        for operation, stats in sorted(latency.items())
+    )
+    if stalled >= 1:
+        text += f" [yellow]no row finished for {stalled:.0f}s"
+    return text
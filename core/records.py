@@ -0,0 +1,119 @@
+"""
+Compact result records for UML Calculator - Community Edition
+
+Batch runs and the CLI history store one record per calculation. Instead of a
+dict of dicts per row, a ResultRecord keeps a small operation code, a field
+name tuple shared by every row with the same inputs, the row's input values,
+the result and the status. Records only become dicts when they are serialized.
+"""
+import datetime
+import threading
+
+_OPERATION_CODES = {}
+_OPERATION_NAMES = []
+_FIELD_TUPLES = {}
+_REGISTER_LOCK = threading.Lock()
+
+def operation_code(operation):
+    """Return the small integer code for an operation name"""
+    code = _OPERATION_CODES.get(operation)
+    if code is None:
+        # Only new operation names take the lock; lookups stay lock-free
+        with _REGISTER_LOCK:
+            code = _OPERATION_CODES.get(operation)
+            if code is None:
+                _OPERATION_NAMES.append(operation)
+                code = _OPERATION_CODES[operation] = len(_OPERATION_NAMES) - 1
+    return code
+
+def shared_fields(fields):
+    """Return a single shared instance of a field name tuple"""
+    fields = tuple(fields)
+    return _FIELD_TUPLES.setdefault(fields, fields)
+
+class ResultRecord:
+    """Result of one calculation"""
+    
+    __slots__ = ('op_code', 'fields', 'values', 'result', 'status', 'timestamp')
+    
+    def __init__(self, operation, fields, values, result, status=None, timestamp=None):
+        self.op_code = operation_code(operation)
+        self.fields = fields
+        self.values = values
+        self.result = result
+        self.status = status
+        self.timestamp = timestamp
+    
+    @property
+    def operation(self):
+        return _OPERATION_NAMES[self.op_code]
+    
+    @property
+    def inputs(self):
+        """Input values by field name (the operation column is not an input)"""
+        return {k: v for k, v in zip(self.fields, self.values) if k != 'operation'}
+    
+    def __getitem__(self, key):
+        # Dict-style access keeps code written against result dicts working
+        if key in ('operation', 'inputs', 'result', 'status'):
+            return getattr(self, key)
+        if key == 'timestamp' and self.timestamp is not None:
+            return datetime.datetime.fromtimestamp(self.timestamp).isoformat()
+        raise KeyError(key)
+    
+    def to_dict(self):
+        """Convert to the dict layout used for JSON export"""
+        record = {}
+        if self.timestamp is not None:
+            record['timestamp'] = self['timestamp']
+        record['operation'] = self.operation
+        record['inputs'] = self.inputs
+        record['result'] = self.result
+        if self.status is not None:
+            record['status'] = self.status
+        return record
+
+class ResultLog:
+    """Append-only list of ResultRecords shared by batch runs and CLI history"""
+    
+    def __init__(self):
+        self._records = []
+    
+    def append(self, operation, fields, values, result, status=None, timestamp=None):
+        """
+        Add a result
+        
+        Args:
+            operation: Operation name like "calc" or "ris"
+            fields: Tuple of input field names, ideally from shared_fields
+            values: Tuple of input values matching fields
+            result: Result of the operation
+            status: Optional status such as "success" or "error"
+            timestamp: Optional POSIX timestamp
+        
+        Returns:
+            The new ResultRecord
+        """
+        record = ResultRecord(operation, fields, values, result, status, timestamp)
+        self._records.append(record)
+        return record
+    
+    def append_inputs(self, operation, inputs, result, status=None, timestamp=None):
+        """Add a result whose inputs are given as a dict"""
+        return self.append(operation, shared_fields(inputs), tuple(inputs.values()), result, status, timestamp)
+    
+    def to_dicts(self):
+        """Convert every record to a dict for serialization"""
+        return [record.to_dict() for record in self._records]
+    
+    def clear(self):
+        self._records.clear()
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def __iter__(self):
+        return iter(self._records)
+    
+    def __getitem__(self, index):
+        return self._records[index]
@@ -4,6 +4,155 @@ Core implementation with limited functionality
 """
 import os
 import sys
+import numpy as np
+
+class RisRule:
+    """
+    One RIS rule: when it applies and what it computes
+    
+    Scalar paths use predicate/action; ris_vectorized uses mask/vector_action.
+    Masks and vector actions see every element, including ones an earlier rule
+    already claimed, so they must not fail on them (e.g. b == 0).
+    """
+    
+    __slots__ = ('code', 'name', 'priority', 'predicate', 'action', 'mask', 'vector_action', 'template')
+    
+    def __init__(self, code, name, priority, predicate, action, mask=None, vector_action=None, template=None):
+        self.code = code
+        self.name = name
+        self.priority = priority
+        self.predicate = predicate
+        self.action = action
+        self.mask = mask
+        self.vector_action = vector_action
+        self.template = template
+    
+    def __repr__(self):
+        return f"RisRule({self.name!r}, priority={self.priority})"
+
+# Registered rules by code. Codes are never reused, and the templates of
+# unregistered rules are kept, so ExplanationBatch entries stay valid when
+# rules are added or removed later
+_RULES = {}
+_RETIRED_TEMPLATES = {}
+_next_code = 0
+_compiled = None
+
+def register_rule(name, predicate, action, mask=None, vector_action=None, template=None, priority=500):
+    """
+    Add a rule to the RIS dispatch table
+    
+    Rules are checked in ascending priority; rules with equal priority are
+    checked in registration order. The built-in rules use priorities 100-400,
+    with the default addition rule last at 1000.
+    
+    Args:
+        name: Unique rule name
+        predicate: f(a, b) -> bool, called only when no earlier rule matched,
+            or a Python expression in a and b such as "a == b", which is
+            inlined into the compiled dispatch
+        action: f(a, b) -> result, or a Python expression in a and b
+        mask: Optional f(a, b) -> bool array for ris_vectorized; defaults to
+            predicate applied element by element
+        vector_action: Optional f(a, b) -> array; defaults to action applied
+            element by element
+        template: Explanation format string with {a}, {b} and {result}
+        priority: Position in the dispatch order
+    
+    Returns:
+        Rule code of the new rule
+    """
+    global _compiled, _next_code
+    if any(rule.name == name for rule in _RULES.values()):
+        raise ValueError(f"RIS rule already registered: {name}")
+    
+    code = _next_code
+    _next_code += 1
+    if template is None:
+        template = f"Rule {name}: RIS({{a}}, {{b}}) = {{result}}"
+    _RULES[code] = RisRule(code, name, priority, predicate, action, mask, vector_action, template)
+    _compiled = None
+    return code
+
+def unregister_rule(name):
+    """Remove a rule from the dispatch table by name"""
+    global _compiled
+    for code, rule in list(_RULES.items()):
+        if rule.name == name:
+            del _RULES[code]
+            _RETIRED_TEMPLATES[code] = rule.template
+            _compiled = None
+            return
+    raise ValueError(f"Unknown RIS rule: {name}")
+
+def rules():
+    """Return the registered rules in dispatch order"""
+    return sorted(_RULES.values(), key=lambda rule: (rule.priority, rule.code))
+
+def _compile_scalar(ordered, with_code):
+    """
+    Generate a straight if-chain over the rules
+    
+    Unrolling the chain avoids a Python loop and tuple unpacking per rule on
+    every call, which is most of the cost of a naive dispatch loop.
+    """
+    namespace = {}
+    lines = ["def dispatch(a, b):"]
+    for i, rule in enumerate(ordered):
+        condition = _inline(rule.predicate, f"p{i}", namespace)
+        result = _inline(rule.action, f"f{i}", namespace)
+        if with_code:
+            result = f"{rule.code}, {result}"
+        lines.append(f"    if {condition}:\n        return {result}")
+    lines.append("    raise ValueError(f'No RIS rule matches a={a}, b={b}')")
+    exec("\n".join(lines), namespace)
+    return namespace["dispatch"]
+
+def _inline(function, name, namespace):
+    """Return source for calling a rule function, inlining expression strings"""
+    if isinstance(function, str):
+        return f"({function})"
+    namespace[name] = function
+    return f"{name}(a, b)"
+
+def _scalar_function(function):
+    if isinstance(function, str):
+        return eval(f"lambda a, b: {function}")
+    return function
+
+def _compile_vector(ordered):
+    """Build the element-wise dispatch for ris_vectorized"""
+    steps = []
+    for rule in ordered:
+        # Rules without vector functions fall back to their scalar definitions
+        predicate, action = _scalar_function(rule.predicate), _scalar_function(rule.action)
+        mask = rule.mask or (lambda a, b, p=predicate: np.vectorize(p, otypes=[bool])(a, b))
+        action = rule.vector_action or (lambda a, b, f=action: np.vectorize(f, otypes=[float])(a, b))
+        steps.append((mask, action))
+    
+    def dispatch(a, b):
+        result = np.full(a.shape, np.nan)
+        remaining = np.ones(a.shape, dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for mask, action in steps:
+                # Each rule only claims elements no earlier rule matched
+                matched = remaining & mask(a, b)
+                if matched.any():
+                    result = np.where(matched, action(a, b), result)
+                    remaining &= ~matched
+                    if not remaining.any():
+                        break
+        return result
+    
+    return dispatch
+
+def _dispatch():
+    """Return the compiled (rule, value, vector) dispatchers, rebuilding after registry changes"""
+    global _compiled
+    if _compiled is None:
+        ordered = rules()
+        _compiled = (_compile_scalar(ordered, True), _compile_scalar(ordered, False), _compile_vector(ordered))
+    return _compiled
 
 def ris(a, b, context=None):
     """
@@ -19,24 +168,103 @@ def ris(a, b, context=None):
     Returns:
         Result of RIS operation
     """
-    # Special case: if one of the values is zero, return addition
-    if a == 0 or b == 0:
-        return a + b
-        
-    # If values are equal, multiply them
-    if a == b:
-        return a * b
-        
-    # If a is divisible by b with no remainder, divide them
-    if a % b == 0 and a > b:
-        return a / b
-        
-    # Simple case for demonstration purposes
-    if a > b and (a % 3 == 0 or b % 3 == 0):
-        return a * b
-        
-    # Default behavior
-    return a + b
+    return (_compiled or _dispatch())[1](a, b)
+
+def ris_vectorized(a, b):
+    """
+    Apply RIS element-wise to arrays of values
+    
+    Matches ris() rule for rule, but computes in float64, so results are
+    floats and very large integers lose precision.
+    
+    Args:
+        a, b: Arrays (or scalars) of input values, broadcast together
+    
+    Returns:
+        numpy array of results
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return (_compiled or _dispatch())[2](a, b)
+
+def ris_rule(a, b):
+    """
+    Apply RIS and report which rule produced the result
+    
+    Args:
+        a, b: Input values
+    
+    Returns:
+        (rule code, result) tuple
+    """
+    return (_compiled or _dispatch())[0](a, b)
+
+def _safe_divisor(b):
+    return np.where(b == 0, 1.0, b)
+
+EXPLANATION_TEMPLATES = (
+    "When one value is zero, RIS performs Addition: {a} + {b} = {result}",
+    "When values are equal, RIS performs Multiplication: {a} × {b} = {result}",
+    "When a is divisible by b, RIS performs Division: {a} ÷ {b} = {result}",
+    "Special case demonstration: {a} × {b} = {result}",
+    "Default operation is Addition: {a} + {b} = {result}",
+)
+
+EXPLANATION_NOTE = "\n\nNote: This is a simplified version. The Enterprise Edition includes the complete Recursive Integration System with advanced mathematical foundations."
+
+# Built-in rules. Each predicate may assume the earlier rules did not match.
+RULE_ZERO = register_rule(
+    "zero",
+    "a == 0 or b == 0",
+    "a + b",
+    mask=lambda a, b: (a == 0) | (b == 0),
+    vector_action=lambda a, b: a + b,
+    template=EXPLANATION_TEMPLATES[0],
+    priority=100,
+)
+RULE_EQUAL = register_rule(
+    "equal",
+    "a == b",
+    "a * b",
+    mask=lambda a, b: a == b,
+    vector_action=lambda a, b: a * b,
+    template=EXPLANATION_TEMPLATES[1],
+    priority=200,
+)
+RULE_DIVISIBLE = register_rule(
+    "divisible",
+    "a % b == 0 and a > b",
+    "a / b",
+    mask=lambda a, b: (np.mod(a, _safe_divisor(b)) == 0) & (a > b),
+    vector_action=lambda a, b: a / _safe_divisor(b),
+    template=EXPLANATION_TEMPLATES[2],
+    priority=300,
+)
+RULE_SPECIAL = register_rule(
+    "special",
+    "a > b and (a % 3 == 0 or b % 3 == 0)",
+    "a * b",
+    mask=lambda a, b: (a > b) & ((np.mod(a, 3) == 0) | (np.mod(b, 3) == 0)),
+    vector_action=lambda a, b: a * b,
+    template=EXPLANATION_TEMPLATES[3],
+    priority=400,
+)
+RULE_DEFAULT = register_rule(
+    "default",
+    "True",
+    "a + b",
+    mask=lambda a, b: np.ones(a.shape, dtype=bool),
+    vector_action=lambda a, b: a + b,
+    template=EXPLANATION_TEMPLATES[4],
+    priority=1000,
+)
+
+def render_explanation(rule, a, b, result):
+    """Render the explanation text for a rule code and its operands"""
+    registered = _RULES.get(rule)
+    template = registered.template if registered is not None else _RETIRED_TEMPLATES.get(rule)
+    if template is None:
+        raise ValueError(f"Unknown RIS rule code: {rule}")
+    return template.format(a=a, b=b, result=result) + EXPLANATION_NOTE
 
 def ris_explain(a, b, context=None):
     """
@@ -49,20 +277,60 @@ def ris_explain(a, b, context=None):
     Returns:
         (result, explanation) tuple
     """
-    result = ris(a, b, context)
+    rule, result = ris_rule(a, b)
+    return result, render_explanation(rule, a, b, result)
+
+class ExplanationBatch:
+    """
+    Explanations for many RIS operations, rendered only when accessed
+    
+    Each entry is stored as a (rule code, a, b, result) tuple.
+    """
+    
+    __slots__ = ('entries',)
+    
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else []
+    
+    @property
+    def results(self):
+        """Results of every operation in order"""
+        return [entry[3] for entry in self.entries]
+    
+    def explanation(self, index):
+        """Render the explanation text for one entry"""
+        rule, a, b, result = self.entries[index]
+        return render_explanation(rule, a, b, result)
+    
+    def render_all(self):
+        """Render every explanation, e.g. for export"""
+        return [render_explanation(*entry) for entry in self.entries]
     
-    # Generate simple explanation
-    if a == 0 or b == 0:
-        explanation = f"When one value is zero, RIS performs Addition: {a} + {b} = {result}"
-    elif a == b:
-        explanation = f"When values are equal, RIS performs Multiplication: {a} × {b} = {result}"
-    elif a % b == 0 and a > b:
-        explanation = f"When a is divisible by b, RIS performs Division: {a} ÷ {b} = {result}"
-    elif a > b and (a % 3 == 0 or b % 3 == 0):
-        explanation = f"Special case demonstration: {a} × {b} = {result}"
-    else:
-        explanation = f"Default operation is Addition: {a} + {b} = {result}"
+    def __len__(self):
+        return len(self.entries)
     
-    explanation += "\n\nNote: This is a simplified version. The Enterprise Edition includes the complete Recursive Integration System with advanced mathematical foundations."
+    def __getitem__(self, index):
+        """Return the (result, explanation) tuple ris_explain would give"""
+        return self.entries[index][3], self.explanation(index)
     
-    return result, explanation
+    def __iter__(self):
+        for rule, a, b, result in self.entries:
+            yield result, render_explanation(rule, a, b, result)
+
+def ris_explain_batch(pairs, context=None):
+    """
+    Evaluate and explain many RIS operations at once
+    
+    Args:
+        pairs: Iterable of (a, b) input pairs
+        context: Optional context parameters
+    
+    Returns:
+        ExplanationBatch with lazily rendered explanations
+    """
+    entries = []
+    append = entries.append
+    for a, b in pairs:
+        rule, result = ris_rule(a, b)
+        append((rule, a, b, result))
+    return ExplanationBatch(entries)
@@ -0,0 +1,156 @@
+"""
+RIS reduction over sequences and operand trees for UML Calculator - Community Edition
+
+RIS is not associative, so every reduction here follows sequential left-fold
+semantics: reduce([a, b, c]) == ris(ris(a, b), c). Instead of splitting one
+sequence into pairs, the vectorized mode folds many independent sequences at
+once, one column per step.
+"""
+import re
+
+import numpy as np
+
+from core.ris_community import ris, ris_vectorized
+
+_END = object()
+
+def ris_reduce(values):
+    """
+    Left-fold RIS over a sequence
+    
+    Args:
+        values: Non-empty sequence of numbers
+    
+    Returns:
+        ris(...ris(ris(v0, v1), v2)..., vn)
+    """
+    iterator = iter(values)
+    try:
+        result = next(iterator)
+    except StopIteration:
+        raise ValueError("RIS reduction needs at least one value")
+    
+    for value in iterator:
+        result = ris(result, value)
+    return result
+
+def ris_scan(values):
+    """
+    Prefix scan of RIS over a sequence
+    
+    Args:
+        values: Non-empty sequence of numbers
+    
+    Returns:
+        List of every intermediate result, starting with the first value
+    """
+    iterator = iter(values)
+    try:
+        result = next(iterator)
+    except StopIteration:
+        raise ValueError("RIS scan needs at least one value")
+    
+    results = [result]
+    for value in iterator:
+        result = ris(result, value)
+        results.append(result)
+    return results
+
+def ris_reduce_tree(tree):
+    """
+    Reduce a nested operand tree
+    
+    Nested lists or tuples are reduced first and their result takes their
+    place, so [1, [2, 3], 4] is ris(ris(1, ris(2, 3)), 4).
+    
+    Args:
+        tree: Number or nested list/tuple of numbers
+    
+    Returns:
+        Result of the reduction
+    """
+    if not isinstance(tree, (list, tuple)):
+        return tree
+    
+    # Walk the tree with an explicit stack so deep nesting cannot overflow.
+    # Each frame is [iterator, accumulated value, has value].
+    stack = [[iter(tree), None, False]]
+    while True:
+        frame = stack[-1]
+        item = next(frame[0], _END)
+        
+        if item is _END:
+            # Subtree finished - its result feeds into the parent frame
+            if not frame[2]:
+                raise ValueError("RIS reduction needs at least one value")
+            stack.pop()
+            if not stack:
+                return frame[1]
+            item = frame[1]
+            frame = stack[-1]
+        elif isinstance(item, (list, tuple)):
+            stack.append([iter(item), None, False])
+            continue
+        
+        frame[1] = ris(frame[1], item) if frame[2] else item
+        frame[2] = True
+
+def ris_reduce_many(sequences, scan=False):
+    """
+    Left-fold RIS over many independent sequences at once
+    
+    Sequences may have different lengths. Each step applies ris_vectorized to
+    one column, so the cost is one numpy call per position rather than one
+    Python call per pair.
+    
+    Args:
+        sequences: 2-D array or list of non-empty sequences
+        scan: Return every intermediate result instead of only the final one
+    
+    Returns:
+        1-D array of results, or a 2-D array of prefix results with NaN past
+        the end of shorter sequences when scan is True
+    """
+    if isinstance(sequences, np.ndarray) and sequences.ndim == 2:
+        values = sequences.astype(float)
+        lengths = np.full(len(values), values.shape[1])
+    else:
+        sequences = [list(sequence) for sequence in sequences]
+        lengths = np.array([len(sequence) for sequence in sequences], dtype=int)
+        values = np.full((len(sequences), lengths.max() if len(sequences) else 0), np.nan)
+        for row, sequence in enumerate(sequences):
+            values[row, :len(sequence)] = sequence
+    
+    if len(lengths) and lengths.min() < 1:
+        raise ValueError("RIS reduction needs at least one value per sequence")
+    if values.shape[1] == 0:
+        return np.empty((0, 0)) if scan else np.empty(0)
+    
+    acc = values[:, 0].copy()
+    prefixes = np.full(values.shape, np.nan) if scan else None
+    if scan:
+        prefixes[:, 0] = acc
+    
+    for column in range(1, values.shape[1]):
+        # Only sequences that still have values at this position advance
+        active = lengths > column
+        acc = np.where(active, ris_vectorized(acc, np.where(active, values[:, column], 0)), acc)
+        if scan:
+            prefixes[active, column] = acc[active]
+    
+    return prefixes if scan else acc
+
+def parse_values(text):
+    """
+    Parse a list of integers separated by commas, semicolons or whitespace
+    
+    Args:
+        text: String like "6,3,2" or "6 3 2"
+    
+    Returns:
+        List of ints
+    """
+    parts = [part for part in re.split(r"[\s,;]+", text.strip()) if part]
+    if not parts:
+        raise ValueError("No values given")
+    return [int(part) for part in parts]
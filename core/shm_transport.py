@@ -0,0 +1,274 @@
+"""
+Shared-memory result transport for UML Calculator - Community Edition
+
+Worker processes normally send every result back to the parent by pickling it.
+SharedResultBuffer replaces that for numeric results: the parent preallocates
+one shared block with a slot per task, workers write ints, floats and arrays
+straight into it, and only results that do not fit a slot (lists, strings,
+symbolic expressions) travel back pickled.
+"""
+import os
+from itertools import repeat
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+# Slot kinds; zero means the result was not stored and comes back pickled
+KIND_PICKLED, KIND_INT, KIND_FLOAT, KIND_ARRAY = range(4)
+STATUS_SUCCESS, STATUS_ERROR = 0, 1
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+_SCALAR_KINDS = {int: KIND_INT, float: KIND_FLOAT, np.float64: KIND_FLOAT}
+
+class SharedResultBuffer:
+    """
+    Preallocated shared memory for task results
+    
+    The block holds, per slot, a kind code, a status, a float64, an int64,
+    the seconds the task took and an (offset, length) pair into a float64
+    arena for array results. The parent creates the buffer; workers attach to
+    it by name and write only to the slots and arena ranges they were given,
+    so no locking is needed.
+    
+    Args:
+        slots: Number of result slots
+        arena_size: Number of float64 values reserved for array results
+        name: Name of an existing buffer to attach to instead of creating one
+    """
+    
+    def __init__(self, slots, arena_size=0, name=None):
+        self.slots = slots
+        self.arena_size = arena_size
+        size = max(1, 8 * (arena_size + 5 * slots) + 2 * slots)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        
+        # Lay out 8-byte arrays first so every view stays aligned
+        buf, offset = self.shm.buf, 0
+        views = []
+        for dtype, shape in ((np.float64, (arena_size,)), (np.float64, (slots,)), (np.int64, (slots,)),
+                             (np.float64, (slots,)), (np.int64, (slots, 2)), (np.int8, (slots,)),
+                             (np.int8, (slots,))):
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            offset += array.nbytes
+            views.append(array)
+        self.arena, self.floats, self.ints, self.seconds, self.offsets, self.kinds, self.status = views
+        if self.owner:
+            self.kinds[:] = KIND_PICKLED
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    def put(self, slot, value, status=STATUS_SUCCESS, seconds=0.0):
+        """
+        Store a scalar result
+        
+        Returns:
+            True if the value now lives in shared memory, False if the caller
+            has to send it back some other way
+        """
+        self.status[slot] = status
+        self.seconds[slot] = seconds
+        kind = type(value)
+        if kind is int and _INT64_MIN <= value <= _INT64_MAX:
+            self.ints[slot] = value
+            self.kinds[slot] = KIND_INT
+            return True
+        if kind is float or kind is np.float64:
+            self.floats[slot] = value
+            self.kinds[slot] = KIND_FLOAT
+            return True
+        self.kinds[slot] = KIND_PICKLED
+        return False
+    
+    def put_many(self, start, values, status=None, seconds=None):
+        """
+        Store a run of scalar results starting at a slot
+        
+        Writing a whole chunk at once costs one numpy assignment per array
+        instead of several per result, which matters for cheap rows like RIS.
+        
+        Args:
+            start: First slot
+            values: List of results
+            status: Optional list of STATUS_* codes (default: all success)
+            seconds: Optional list of task durations
+        
+        Returns:
+            Dict of slot to value for results that were not stored
+        """
+        count = len(values)
+        stop = start + count
+        # Classify by exact type with C-level iteration; no Python loop per result
+        kinds = np.fromiter(map(_SCALAR_KINDS.get, map(type, values), repeat(KIND_PICKLED)),
+                            dtype=np.int8, count=count)
+        objects = np.empty(count, dtype=object)
+        objects[:] = values
+        
+        is_int = kinds == KIND_INT
+        try:
+            ints = objects[is_int].astype(np.int64)
+        except OverflowError:
+            # Ints beyond int64 fall back to pickling
+            for index in np.flatnonzero(is_int):
+                if not _INT64_MIN <= values[index] <= _INT64_MAX:
+                    kinds[index] = KIND_PICKLED
+            is_int = kinds == KIND_INT
+            ints = objects[is_int].astype(np.int64)
+        is_float = kinds == KIND_FLOAT
+        
+        self.ints[start:stop][is_int] = ints
+        self.floats[start:stop][is_float] = objects[is_float].astype(np.float64)
+        self.kinds[start:stop] = kinds
+        self.status[start:stop] = STATUS_SUCCESS if status is None else status
+        self.seconds[start:stop] = 0.0 if seconds is None else seconds
+        return {start + int(index): values[index] for index in np.flatnonzero(kinds == KIND_PICKLED)}
+    
+    def get_many(self, start, stop, fallbacks=None):
+        """
+        Read a run of scalar results back
+        
+        Args:
+            start, stop: Slot range
+            fallbacks: Dict of slot to value for results that were not stored
+        
+        Returns:
+            List of results
+        """
+        fallbacks = fallbacks or {}
+        kinds = self.kinds[start:stop].tolist()
+        ints = self.ints[start:stop].tolist()
+        floats = self.floats[start:stop].tolist()
+        return [
+            ints[i] if kind == KIND_INT else floats[i] if kind == KIND_FLOAT
+            else self.get(start + i, fallbacks.get(start + i))
+            for i, kind in enumerate(kinds)
+        ]
+    
+    def put_array(self, slot, values, offset, status=STATUS_SUCCESS, seconds=0.0):
+        """Copy a float array into the arena at an offset the parent assigned"""
+        values = np.asarray(values, dtype=float).ravel()
+        if offset + len(values) > self.arena_size:
+            raise ValueError(f"Array of {len(values)} values does not fit the arena at offset {offset}")
+        self.arena[offset:offset + len(values)] = values
+        self.offsets[slot] = (offset, len(values))
+        self.status[slot] = status
+        self.seconds[slot] = seconds
+        self.kinds[slot] = KIND_ARRAY
+    
+    def get(self, slot, fallback=None):
+        """
+        Read a result back
+        
+        Args:
+            slot: Slot index
+            fallback: Value to return for slots that were not stored
+        
+        Returns:
+            int, float, array copy, or fallback
+        """
+        kind = self.kinds[slot]
+        if kind == KIND_INT:
+            return int(self.ints[slot])
+        if kind == KIND_FLOAT:
+            return float(self.floats[slot])
+        if kind == KIND_ARRAY:
+            offset, length = self.offsets[slot]
+            return self.arena[offset:offset + length].copy()
+        return fallback
+    
+    def close(self):
+        """Detach from the block, and free it if this process created it"""
+        # Views must go before the mapping can be closed
+        self.arena = self.floats = self.ints = self.seconds = self.offsets = self.kinds = self.status = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def chunk_ranges(count, workers, min_chunk=64):
+    """
+    Split count tasks into contiguous (start, stop) ranges
+    
+    Several chunks per worker keep the pool balanced when rows differ in cost.
+    """
+    size = max(min_chunk, -(-count // (workers * 8)))
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+# Buffer attached in each worker process by attach_worker
+_worker_buffer = None
+
+def attach_worker(name, slots, arena_size):
+    """Pool initializer: attach the worker process to the shared buffer"""
+    global _worker_buffer
+    _worker_buffer = SharedResultBuffer(slots, arena_size, name=name)
+
+def worker_buffer():
+    """Return the buffer attached by attach_worker"""
+    return _worker_buffer
+
+def _plot_chunk(task):
+    """Evaluate a chunk of plot expressions into the arena"""
+    # Imported here so the transport itself does not depend on sympy
+    from core.symbolic import generate_plot_data
+    
+    start, expressions, x_min, x_max, points, backend = task
+    buffer = worker_buffer()
+    errors = {}
+    for slot, expression in enumerate(expressions, start):
+        try:
+            _, y_values = generate_plot_data(expression, x_min, x_max, points, backend)
+            buffer.put_array(slot, y_values, slot * points)
+        except Exception as e:
+            buffer.put(slot, None, STATUS_ERROR)
+            errors[slot] = str(e)
+    return errors
+
+def generate_plot_data_many(expressions, x_min=-10, x_max=10, points=500, backend="auto", workers=None):
+    """
+    Evaluate many plot expressions in worker processes
+    
+    Every expression is sampled on the same grid, so the y arrays are written
+    side by side into one shared arena and no array is pickled.
+    
+    Args:
+        expressions: List of expressions in terms of x
+        x_min, x_max: Range for x values
+        points: Number of points per expression
+        backend: Evaluation backend passed to generate_plot_data
+        workers: Number of worker processes (default: CPU count)
+    
+    Returns:
+        (x_values, y_values, errors) where y_values has one row per expression
+        (NaN for failed expressions) and errors maps index to error message
+    """
+    expressions = list(expressions)
+    workers = workers or os.cpu_count() or 1
+    count = len(expressions)
+    x_values = np.linspace(x_min, x_max, points)
+    errors = {}
+    
+    with SharedResultBuffer(count, count * points) as buffer:
+        tasks = [
+            (start, expressions[start:stop], x_min, x_max, points, backend)
+            for start, stop in chunk_ranges(count, workers, min_chunk=1)
+        ]
+        with Pool(workers, initializer=attach_worker, initargs=(buffer.name, count, count * points)) as pool:
+            for chunk_errors in pool.imap_unordered(_plot_chunk, tasks):
+                errors.update(chunk_errors)
+        
+        y_values = buffer.arena.reshape(count, points).copy()
+        y_values[buffer.kinds != KIND_ARRAY] = np.nan
+    
+    return x_values, y_values, errors
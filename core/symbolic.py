@@ -5,6 +5,11 @@ import sympy
 import numpy as np
 from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 from sympy import symbols, sympify, Eq, solve
+from core.kernels import ExpressionKernel
+from core.numeric_solver import solve_numeric
+
+SOLVE_METHODS = ("auto", "symbolic", "numeric")
+SYMBOLIC_MAX_DEGREE = 4  # Higher degrees have no general closed form
 
 def evaluate_expression(expr_str, x_value=None):
     """
@@ -32,16 +37,31 @@ def evaluate_expression(expr_str, x_value=None):
             # Just evaluate the left side
             expr_str = sides[0].strip()
     
-    # Define symbols
-    x, y, z = symbols('x y z')
-    
     # Configure sympy parser with implicit multiplication
     transformations = standard_transformations + (implicit_multiplication_application,)
     
     try:
         # Parse the expression
         expr = parse_expr(expr_str, transformations=transformations)
+    except Exception as e:
+        raise ValueError(f"Error evaluating expression: {str(e)}")
+    
+    return evaluate_parsed(expr, x_value)
+
+def evaluate_parsed(expr, x_value=None):
+    """
+    Evaluate an already parsed expression like evaluate_expression does
+    
+    Args:
+        expr: sympy expression, e.g. from parse_calc_expression
+        x_value: Value to substitute for x if present
         
+    Returns:
+        Evaluated result
+    """
+    x = symbols('x')
+    
+    try:
         # Substitute x value if provided
         if x_value is not None:
             expr = expr.subs(x, x_value)
@@ -55,17 +75,83 @@ def evaluate_expression(expr_str, x_value=None):
     except Exception as e:
         raise ValueError(f"Error evaluating expression: {str(e)}")
 
-def generate_plot_data(expr_str, x_min=-10, x_max=10, points=500):
+def parse_calc_expression(expr_str):
     """
-    Generate x,y values for plotting a mathematical expression
+    Parse a calc expression once so it can be both grouped and evaluated
+    
+    Args:
+        expr_str: String expression like "x^2+2*x" or "2x + x^2"
+        
+    Returns:
+        sympy expression, or None for equations and expressions that cannot
+        be parsed (evaluate_expression handles and reports those)
+    """
+    # Normalize exponentiation and whitespace
+    normalized = " ".join(expr_str.replace("^", "**").split())
+    
+    # Equations are solved rather than evaluated
+    if "=" in normalized:
+        return None
+    
+    # Configure sympy parser with implicit multiplication
+    transformations = standard_transformations + (implicit_multiplication_application,)
+    
+    try:
+        return parse_expr(normalized, transformations=transformations)
+    except Exception:
+        return None
+
+def canonicalize_expression(expr_str):
+    """
+    Build a canonical key for an expression so equivalent inputs can be grouped
+    
+    Args:
+        expr_str: String expression like "x^2+2*x" or "2x + x^2"
+        
+    Returns:
+        Canonical string for the expression. Equations and expressions that
+        cannot be parsed fall back to a whitespace-normalized form.
+    """
+    # SymPy orders the terms of the parsed expression canonically
+    expr = parse_calc_expression(expr_str)
+    if expr is None:
+        return " ".join(expr_str.replace("^", "**").split())
+    return sympy.srepr(expr)
+
+def parse_expression(expr_str):
+    """
+    Parse an expression or equation into a sympy tree without evaluating it
+    
+    Args:
+        expr_str: String expression like "3*x^2 - 5*x + 2" or equation "x^2 = 4"
+        
+    Returns:
+        sympy expression, or an unevaluated sympy Eq for equations
+    """
+    # Clean up the expression
+    expr_str = expr_str.replace("^", "**")  # Replace ^ with ** for exponentiation
+    
+    # Configure sympy parser with implicit multiplication
+    transformations = standard_transformations + (implicit_multiplication_application,)
+    
+    if "=" in expr_str:
+        left, right = expr_str.split("=", 1)
+        return Eq(
+            parse_expr(left.strip(), transformations=transformations),
+            parse_expr(right.strip(), transformations=transformations),
+            evaluate=False
+        )
+    return parse_expr(expr_str, transformations=transformations)
+
+def compile_plot_kernel(expr_str):
+    """
+    Parse an expression in terms of x and compile it to array kernels
     
     Args:
         expr_str: String expression in terms of x
-        x_min, x_max: Range for x values
-        points: Number of points to generate
         
     Returns:
-        (x_values, y_values) as numpy arrays
+        ExpressionKernel for the expression
     """
     # Clean up the expression
     expr_str = expr_str.replace("^", "**")  # Replace ^ with ** for exponentiation
@@ -76,39 +162,73 @@ def generate_plot_data(expr_str, x_min=-10, x_max=10, points=500):
     # Configure sympy parser with implicit multiplication
     transformations = standard_transformations + (implicit_multiplication_application,)
     
+    # Parse the expression and compile it
+    expr = parse_expr(expr_str, transformations=transformations)
+    return ExpressionKernel(expr, x)
+
+def evaluate_plot_kernel(kernel, x_values, backend="auto"):
+    """
+    Evaluate a compiled kernel, mapping non-finite values to NaN
+    
+    Args:
+        kernel: ExpressionKernel from compile_plot_kernel
+        x_values: Array of x values
+        backend: Evaluation backend - "auto", "numpy", "numexpr" or "chunked"
+        
+    Returns:
+        Array of y values
+    """
     try:
-        # Parse the expression
-        expr = parse_expr(expr_str, transformations=transformations)
+        y_values = kernel.evaluate(x_values, backend)
         
-        # Convert sympy expression to numpy function
-        f = sympy.lambdify(x, expr, "numpy")
+        # Replace infinity and NaN with None for plotting
+        return np.where(np.isfinite(y_values), y_values, np.nan)
+    except Exception as e:
+        raise ValueError(f"Error calculating function values: {str(e)}")
+
+def generate_plot_data(expr_str, x_min=-10, x_max=10, points=500, backend="auto"):
+    """
+    Generate x,y values for plotting a mathematical expression
+    
+    Args:
+        expr_str: String expression in terms of x
+        x_min, x_max: Range for x values
+        points: Number of points to generate
+        backend: Evaluation backend - "auto", "numpy", "numexpr" or "chunked"
+        
+    Returns:
+        (x_values, y_values) as numpy arrays
+    """
+    try:
+        # Parse the expression and compile it to array kernels
+        kernel = compile_plot_kernel(expr_str)
         
         # Generate x values
         x_values = np.linspace(x_min, x_max, points)
         
         # Calculate y values with handling for potential numerical errors
-        try:
-            y_values = f(x_values)
-            
-            # Replace infinity and NaN with None for plotting
-            y_values = np.where(np.isfinite(y_values), y_values, np.nan)
-            
-            return x_values, y_values
-        except Exception as e:
-            raise ValueError(f"Error calculating function values: {str(e)}")
+        y_values = evaluate_plot_kernel(kernel, x_values, backend)
+        
+        return x_values, y_values
     except Exception as e:
         raise ValueError(f"Error processing expression: {str(e)}")
 
-def solve_equation(equation_str):
+def solve_equation(equation_str, method="auto", x_range=(-100, 100)):
     """
     Solve an equation for x
     
     Args:
         equation_str: String equation like "x^2 - 4 = 0" or just "x^2 - 4" (= 0 implied)
+        method: "symbolic", "numeric", or "auto" to use the numeric engine for
+            high-degree polynomials and as a fallback when sympy cannot solve
+        x_range: Search range for numeric solving of non-polynomial functions
         
     Returns:
         Solution(s) for x
     """
+    if method not in SOLVE_METHODS:
+        raise ValueError(f"Unknown solve method: {method}. Available methods: {', '.join(SOLVE_METHODS)}")
+    
     # Clean up the equation
     equation_str = equation_str.replace("^", "**")  # Replace ^ with ** for exponentiation
     
@@ -126,21 +246,56 @@ def solve_equation(equation_str):
     try:
         # Parse the expression
         expr = parse_expr(equation_str, transformations=transformations)
-        
-        # Solve the equation
-        solutions = solve(expr, x)
-        
-        # Convert complex solutions to strings if needed
-        processed_solutions = []
-        for sol in solutions:
-            try:
-                processed_solutions.append(float(sol))
-            except (TypeError, ValueError):
-                # Keep as sympy expression if cannot convert to float
-                processed_solutions.append(str(sol))
+        processed_solutions = solve_parsed(expr, x, method, x_range)
         
         if len(processed_solutions) == 1:
             return processed_solutions[0]
         return processed_solutions
     except Exception as e:
         raise ValueError(f"Error solving equation: {str(e)}")
+
+def solve_parsed(expr, x, method="auto", x_range=(-100, 100)):
+    """
+    Solve an already parsed expression for x (expr = 0)
+    
+    Args:
+        expr: SymPy expression
+        x: Symbol to solve for
+        method: "symbolic", "numeric" or "auto", as in solve_equation
+        x_range: Search range for numeric solving of non-polynomial functions
+    
+    Returns:
+        List of solutions: floats, or strings for complex/symbolic ones
+    """
+    if method == "auto" and _is_high_degree_polynomial(expr, x):
+        method = "numeric"
+    
+    if method == "numeric":
+        return solve_numeric(expr, x, *x_range)
+    
+    try:
+        # Solve the equation
+        solutions = solve(expr, x)
+    except Exception:
+        if method == "symbolic":
+            raise
+        # Fall back to the numeric engine when sympy cannot solve
+        return solve_numeric(expr, x, *x_range)
+    
+    # Convert complex solutions to strings if needed
+    processed_solutions = []
+    for sol in solutions:
+        try:
+            processed_solutions.append(float(sol))
+        except (TypeError, ValueError):
+            # Keep as sympy expression if cannot convert to float
+            processed_solutions.append(str(sol))
+    return processed_solutions
+
+def _is_high_degree_polynomial(expr, x):
+    """Check whether expr is a polynomial in x too large to solve symbolically"""
+    try:
+        poly = sympy.Poly(expr, x)
+    except sympy.PolynomialError:
+        return False
+    return poly.degree() > SYMBOLIC_MAX_DEGREE and all(c.is_number for c in poly.all_coeffs())
@@ -0,0 +1,255 @@
+"""
+Parameterized expression templates for UML Calculator - Community Edition
+
+A template such as "a*x^2 + b*x + c" is parsed and compiled once with its
+coefficients as symbolic parameters. It can then be evaluated, plotted or
+solved for whole arrays of coefficients in one vectorized call instead of
+parsing, lambdifying or solving every variant separately.
+"""
+import numpy as np
+import sympy
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
+
+from core.kernels import PROBE_POINTS
+from core.numeric_solver import _format_complex
+from core.symbolic import solve_parsed, SOLVE_METHODS
+
+# Relative residual a closed-form root must reach before it is trusted
+RESIDUAL_TOLERANCE = 1e-7
+POLISH_STEPS = 2
+
+class ExpressionTemplate:
+    """
+    An expression in x whose coefficients are parameters
+    
+    Coefficients are passed as a dict of parameter name to array, or as a 2-D
+    array with one column per parameter in the order of params. Arrays are
+    broadcast against each other, so a scalar coefficient applies to every row.
+    
+    Args:
+        expr_str: Expression or equation, e.g. "a*x^2 + b*x + c" or "a*x = b"
+        params: Parameter names in column order (default: every symbol other
+            than x, sorted by name)
+    """
+    
+    def __init__(self, expr_str, params=None):
+        self.x = sympy.Symbol('x')
+        
+        # Clean up the expression
+        expr_str = expr_str.replace("^", "**")  # Replace ^ with ** for exponentiation
+        self.is_equation = "=" in expr_str
+        if self.is_equation:
+            left, right = expr_str.split("=", 1)
+            expr_str = f"{left.strip()} - ({right.strip()})"
+        
+        # Declared parameters are passed to the parser so multi-letter names
+        # like "c1" are not split by implicit multiplication
+        local_dict = {name: sympy.Symbol(name) for name in (params or ())}
+        local_dict['x'] = self.x
+        transformations = standard_transformations + (implicit_multiplication_application,)
+        try:
+            self.expr = parse_expr(expr_str, transformations=transformations, local_dict=local_dict)
+        except Exception as e:
+            raise ValueError(f"Error parsing template: {str(e)}")
+        
+        free = {symbol.name: symbol for symbol in self.expr.free_symbols if symbol != self.x}
+        if params is None:
+            params = sorted(free)
+        elif set(free) - set(params):
+            raise ValueError(f"Template uses undeclared parameters: {', '.join(sorted(set(free) - set(params)))}")
+        self.params = tuple(params)
+        self.symbols = tuple(local_dict.get(name, sympy.Symbol(name)) for name in self.params)
+        
+        self._function = sympy.lambdify(self.symbols + (self.x,), self.expr, "numpy")
+        self._closed_forms = None
+    
+    def __repr__(self):
+        return f"ExpressionTemplate({str(self.expr)!r}, params={self.params})"
+    
+    def columns(self, coefficients):
+        """
+        Turn coefficients into one broadcast 1-D array per parameter
+        
+        Args:
+            coefficients: Dict of name to values, or 2-D array of rows
+        
+        Returns:
+            List of arrays in params order, all with the same length
+        """
+        if isinstance(coefficients, dict):
+            missing = set(self.params) - set(coefficients)
+            if missing:
+                raise ValueError(f"Missing coefficients: {', '.join(sorted(missing))}")
+            columns = [np.asarray(coefficients[name], dtype=float) for name in self.params]
+        else:
+            rows = np.asarray(coefficients, dtype=float)
+            if rows.ndim == 1 and len(self.params) == 1:
+                rows = rows[:, None]
+            if rows.ndim != 2 or rows.shape[1] != len(self.params):
+                raise ValueError(f"Expected one column per parameter ({', '.join(self.params)})")
+            columns = list(rows.T)
+        return [np.ravel(column) for column in np.broadcast_arrays(*columns, np.empty(1))[:-1]]
+    
+    def evaluate(self, coefficients, x_values=0.0):
+        """
+        Evaluate the template for every coefficient row
+        
+        Args:
+            coefficients: Dict of name to values, or 2-D array of rows
+            x_values: Scalar x, or array with one x per row
+        
+        Returns:
+            Array with one value per row (NaN where undefined)
+        """
+        columns = self.columns(coefficients)
+        return self._evaluate(columns, np.asarray(x_values, dtype=float))
+    
+    def plot(self, coefficients, x_min=-10, x_max=10, points=500):
+        """
+        Sample the template over a grid for every coefficient row
+        
+        Args:
+            coefficients: Dict of name to values, or 2-D array of rows
+            x_min, x_max: Range for x values
+            points: Number of points per row
+        
+        Returns:
+            (x_values, y_values) with y_values of shape (rows, points)
+        """
+        x_values = np.linspace(x_min, x_max, points)
+        columns = [column[:, None] for column in self.columns(coefficients)]
+        return x_values, self._evaluate(columns, x_values[None, :])
+    
+    def solve(self, coefficients, method="auto", x_range=(-100, 100)):
+        """
+        Solve the template = 0 for x for every coefficient row
+        
+        The template is solved symbolically once. The closed forms are then
+        evaluated for all rows at once and checked against the template; rows
+        where they do not apply (for example a = 0 in a quadratic, or a row
+        that makes the template identically zero) or that have no closed
+        form are solved one by one as solve_equation would.
+        
+        Args:
+            coefficients: Dict of name to values, or 2-D array of rows
+            method: "symbolic", "numeric" or "auto", as in solve_equation
+            x_range: Search range for numeric solving of non-polynomial rows
+        
+        Returns:
+            List with one entry per row, shaped like solve_equation results:
+            a single solution, or a list of floats and complex strings.
+            Complex roots from closed forms are printed to 12 significant
+            digits, like the numeric engine.
+        """
+        if method not in SOLVE_METHODS:
+            raise ValueError(f"Unknown solve method: {method}. Available methods: {', '.join(SOLVE_METHODS)}")
+        columns = self.columns(coefficients)
+        count = len(columns[0]) if columns else 1
+        
+        solutions = [None] * count
+        closed_forms = self._compile_solutions() if method != "numeric" else None
+        if closed_forms:
+            roots, valid = self._closed_form_roots(closed_forms, columns, count)
+            for row in np.flatnonzero(valid):
+                solutions[row] = _format_roots(roots[row])
+        
+        for row in range(count):
+            if solutions[row] is None:
+                # Degenerate row or no closed form: solve this variant on its own
+                values = {symbol: _coefficient(column[row]) for symbol, column in zip(self.symbols, columns)}
+                try:
+                    solutions[row] = solve_parsed(self.expr.subs(values), self.x, method, x_range)
+                except Exception as e:
+                    raise ValueError(f"Error solving row {row}: {str(e)}")
+        
+        return [row[0] if len(row) == 1 else row for row in solutions]
+    
+    def _evaluate(self, columns, x_values):
+        """Evaluate the compiled function, mapping non-finite values to NaN"""
+        with np.errstate(all='ignore'):
+            y_values = np.asarray(self._function(*columns, x_values))
+            shape = np.broadcast_shapes(x_values.shape, *(column.shape for column in columns))
+            y_values = np.broadcast_to(y_values, shape)
+            if np.iscomplexobj(y_values):
+                y_values = np.where(y_values.imag == 0, y_values.real, np.nan)
+            return np.where(np.isfinite(y_values), y_values, np.nan)
+    
+    def _compile_solutions(self):
+        """Solve the template symbolically once and lambdify each closed form"""
+        if self._closed_forms is None:
+            self._closed_forms = False
+            try:
+                forms = sympy.solve(self.expr, self.x)
+            except Exception:
+                forms = []
+            # Implicit solutions (RootOf) would need a solver per row anyway
+            if forms and not any(form.has(sympy.RootOf, sympy.CRootOf) for form in forms):
+                self._closed_forms = [sympy.lambdify(self.symbols, form, "numpy") for form in forms]
+                arguments = self.symbols + (self.x,)
+                terms = sympy.Add.make_args(sympy.expand(self.expr))
+                self._derivative = sympy.lambdify(arguments, sympy.diff(self.expr, self.x), "numpy")
+                self._scale = sympy.lambdify(arguments, sum(abs(term) for term in terms), "numpy")
+        return self._closed_forms
+    
+    def _closed_form_roots(self, closed_forms, columns, count):
+        """
+        Evaluate the closed forms for every row
+        
+        Returns:
+            (roots, valid): complex array of shape (rows, forms) and a mask of
+            rows where every root is finite and satisfies the template, and
+            the template is not identically zero
+        """
+        complex_columns = [column.astype(complex) for column in columns]
+        roots = np.empty((count, len(closed_forms)), dtype=complex)
+        valid = np.ones(count, dtype=bool)
+        with np.errstate(all='ignore'):
+            for i, form in enumerate(closed_forms):
+                root = np.broadcast_to(form(*complex_columns), count).astype(complex)
+                residual = self._residual(complex_columns, root, count)
+                
+                # Closed forms like Cardano's lose digits; Newton steps win them
+                # back, and a step is only kept where it lowers the residual
+                for _ in range(POLISH_STEPS):
+                    slope = np.broadcast_to(self._derivative(*complex_columns, root), count)
+                    step = np.where(slope != 0, self._function(*complex_columns, root) / slope, 0)
+                    polished = root - np.where(np.isfinite(step), step, 0)
+                    polished_residual = self._residual(complex_columns, polished, count)
+                    better = polished_residual < residual
+                    root = np.where(better, polished, root)
+                    residual = np.where(better, polished_residual, residual)
+                
+                scale = np.abs(np.broadcast_to(self._scale(*complex_columns, root), count))
+                valid &= np.isfinite(root) & (residual <= RESIDUAL_TOLERANCE * (1 + scale))
+                roots[:, i] = root
+            
+            # A row that vanishes at every probe point is identically zero
+            # (a = 0 in a*x), where the closed forms do not apply
+            vanishes = np.ones(count, dtype=bool)
+            for probe in PROBE_POINTS:
+                scale = np.abs(np.broadcast_to(self._scale(*complex_columns, probe), count))
+                vanishes &= self._residual(complex_columns, probe, count) <= RESIDUAL_TOLERANCE * (1 + scale)
+            valid &= ~vanishes
+        return roots, valid
+    
+    def _residual(self, columns, x_values, count):
+        return np.abs(np.broadcast_to(self._function(*columns, x_values), count))
+
+def _coefficient(value):
+    """Substitute integral coefficients as ints so SymPy keeps exact arithmetic"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def _format_roots(roots):
+    """Dedupe one row of roots and format them like solve_equation"""
+    # Rounding noise relative to the largest root is treated as zero
+    noise = 1e-12 * (1 + max(abs(root) for root in roots))
+    unique = []
+    for root in roots:
+        root = complex(0.0 if abs(root.real) <= noise else root.real, 0.0 if abs(root.imag) <= noise else root.imag)
+        if not any(abs(root - other) <= 1e-9 * (1 + abs(root)) for other in unique):
+            unique.append(root)
+    
+    real = sorted(root.real for root in unique if root.imag == 0)
+    complex_roots = sorted((root for root in unique if root.imag != 0), key=lambda root: (root.real, root.imag))
+    return real + [_format_complex(root) for root in complex_roots]
@@ -4,16 +4,143 @@ This module provides limited UML diagram generation capabilities
 """
 import os
 import tempfile
+import hashlib
+from collections import deque, OrderedDict
 import pydot
+import sympy
+
+# Expression trees larger than this are collapsed into placeholder nodes
+DEFAULT_NODE_BUDGET = 150
+
+OPERATOR_LABELS = {
+    "Add": "+",
+    "Mul": "×",
+    "Pow": "^",
+    "Equality": "=",
+}
+
+def _node_label(expr):
+    """Label for one node of an expression tree"""
+    if not expr.args:
+        return str(expr)
+    name = type(expr).__name__
+    return OPERATOR_LABELS.get(name, name)
+
+def _escape(text):
+    """Escape text for a quoted DOT string"""
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class ExpressionDAG:
+    """
+    Expression tree with identical subexpressions merged into one node
+    
+    Attributes:
+        root: Root sympy expression
+        nodes: Distinct subexpressions in breadth-first order
+        collapsed: Subexpressions left unexpanded because of the node budget
+        truncated: Dict of expanded node to the children that did not fit the
+            budget; they are drawn as a single "N more terms" placeholder
+    """
+    
+    def __init__(self, root, max_nodes=DEFAULT_NODE_BUDGET):
+        self.root = root
+        self.nodes = []
+        self.collapsed = []
+        self.truncated = {}
+        
+        # Hash-consing: sympy expressions compare structurally, so a dict
+        # keyed by subexpression merges every repeated subtree
+        seen = {root}
+        queue = deque([root])
+        while queue:
+            expr = queue.popleft()
+            children = [child for child in dict.fromkeys(expr.args) if child not in seen]
+            
+            # Expand only while the nodes drawn so far stay within the budget
+            drawn = len(self.nodes) + len(self.collapsed) + len(self.truncated) + len(queue) + 1
+            if children and drawn + len(children) > max_nodes:
+                if self.nodes:
+                    self.collapsed.append(expr)
+                    continue
+                # The root is always expanded: show what fits and merge the
+                # rest of its children into one placeholder node
+                room = max(0, max_nodes - drawn - 1)
+                children, hidden = children[:room], children[room:]
+                self.truncated[expr] = hidden
+            
+            self.nodes.append(expr)
+            seen.update(children)
+            queue.extend(children)
+        
+        self._expanded = set(self.nodes)
+    
+    def is_collapsed(self, expr):
+        return expr not in self._expanded
+    
+    @property
+    def edge_count(self):
+        return sum(len(self.visible_args(expr)) + (expr in self.truncated) for expr in self.nodes)
+    
+    def visible_args(self, expr):
+        """Arguments of an expanded node that are drawn as their own nodes"""
+        # A repeated argument, as in x**x, is one node with one edge
+        args = tuple(dict.fromkeys(expr.args))
+        hidden = self.truncated.get(expr)
+        if not hidden:
+            return args
+        hidden = set(hidden)
+        return tuple(arg for arg in args if arg not in hidden)
+    
+    def remainders(self):
+        """
+        One expression per placeholder holding the children it replaces
+        
+        Returns:
+            List of sympy expressions, e.g. the sum of the hidden terms
+        """
+        return [_remainder(expr, hidden) for expr, hidden in self.truncated.items()]
+
+def _remainder(expr, hidden):
+    """Rebuild the children a placeholder hides into one expression"""
+    if isinstance(expr, (sympy.Add, sympy.Mul)):
+        return expr.func(*hidden, evaluate=False)
+    return sympy.Tuple(*hidden)
+
+def _remainder_label(expr, count):
+    """Label for the placeholder of a node's hidden children"""
+    if isinstance(expr, sympy.Add):
+        noun = "term" if count == 1 else "terms"
+    elif isinstance(expr, sympy.Mul):
+        noun = "factor" if count == 1 else "factors"
+    else:
+        noun = "argument" if count == 1 else "arguments"
+    return f"{count} more {noun}"
 
 class UMLGenerator:
-    """Generate UML diagrams for mathematical operations (Community Edition)"""
+    """
+    Generate UML diagrams for mathematical operations (Community Edition)
+    
+    Args:
+        output_dir: Directory for generated diagrams
+        max_cached_nodes: Subexpressions to keep DOT statements for; beyond
+            this the subtree caches start over
+        max_rendered: Rendered diagram files to remember, least recently
+            used first out
+    """
     
-    def __init__(self):
+    def __init__(self, output_dir=None, max_cached_nodes=20_000, max_rendered=256):
         # Initialize with basic capabilities
-        self.output_dir = os.path.join(tempfile.gettempdir(), "uml_calculator")
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "uml_calculator")
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # Expression diagram caches: stable node ids, DOT statements per
+        # subtree, and rendered files per DOT source
+        self.max_cached_nodes = max_cached_nodes
+        self.max_rendered = max_rendered
+        self._node_ids = {}
+        self._fragments = {}
+        self._rendered = OrderedDict()
+        
     def generate_ris_diagram(self, a, b, result, operation=None):
         """
         Generate a simple UML diagram for RIS operation
@@ -115,3 +242,173 @@ class UMLGenerator:
         graph.write_png(output_file)
         
         return output_file
+        
+    def build_expression_dag(self, expression, max_nodes=DEFAULT_NODE_BUDGET):
+        """
+        Parse an expression and merge its shared subexpressions
+        
+        Args:
+            expression: Expression string or sympy expression
+            max_nodes: Node budget before subtrees are collapsed
+            
+        Returns:
+            ExpressionDAG
+        """
+        if isinstance(expression, str):
+            from core.symbolic import parse_expression
+            expression = parse_expression(expression)
+        return ExpressionDAG(sympy.sympify(expression), max_nodes)
+        
+    def expression_dot(self, dag):
+        """
+        Build the DOT source for an expression DAG
+        
+        The statements for each subtree are cached, so rendering an
+        expression that shares subtrees with earlier ones reuses them.
+        
+        Args:
+            dag: ExpressionDAG from build_expression_dag
+            
+        Returns:
+            DOT source string
+        """
+        if len(self._node_ids) > self.max_cached_nodes:
+            # Fragments refer to each other's node ids, so both caches go
+            # together, and only between renders
+            self._node_ids.clear()
+            self._fragments.clear()
+        
+        lines = [
+            "digraph expression {",
+            "  ordering=out;",
+            '  node [shape=box, style=rounded, fontname="Helvetica"];',
+        ]
+        for expr in dag.nodes:
+            if expr in dag.truncated:
+                lines.extend(self._truncated_fragment(expr, dag.truncated[expr], dag.visible_args(expr)))
+            else:
+                lines.extend(self._node_fragment(expr))
+        for expr in dag.collapsed:
+            lines.extend(self._collapsed_fragment(expr))
+        lines.append("}")
+        return "\n".join(lines)
+        
+    def generate_expression_diagram(self, expression, max_nodes=DEFAULT_NODE_BUDGET):
+        """
+        Generate an expression-tree diagram with shared subexpressions merged
+        
+        Args:
+            expression: Expression or equation string, or sympy expression
+            max_nodes: Node budget before subtrees are collapsed
+            
+        Returns:
+            Path to generated diagram file
+        """
+        dag = self.build_expression_dag(expression, max_nodes)
+        return self._render_dot(self.expression_dot(dag))
+        
+    def generate_expression_pages(self, expression, max_nodes=DEFAULT_NODE_BUDGET, max_pages=20, stats=None):
+        """
+        Generate a paginated expression-tree diagram
+        
+        The first page shows the expression down to the node budget. Each
+        collapsed subtree, and each group of children merged into a "more
+        terms" placeholder, gets its own page, rendered the same way.
+        
+        Args:
+            expression: Expression or equation string, or sympy expression
+            max_nodes: Node budget per page
+            max_pages: Maximum number of pages to render
+            stats: Optional dict that receives the number of pages rendered
+                and of subtrees left without a page because of max_pages
+            
+        Returns:
+            List of paths to generated diagram files, root page first
+        """
+        page = self.build_expression_dag(expression, max_nodes)
+        pages = []
+        queue = deque()
+        while True:
+            pages.append(self._render_dot(self.expression_dot(page)))
+            # Merged children continue the page they came from, so they go first
+            queue.extend(page.remainders())
+            queue.extend(page.collapsed)
+            if not queue or len(pages) >= max_pages:
+                break
+            page = ExpressionDAG(queue.popleft(), max_nodes)
+        
+        if stats is not None:
+            stats['pages'] = len(pages)
+            stats['skipped_subtrees'] = len(queue)
+        return pages
+        
+    def _node_id(self, expr):
+        """Stable DOT node id for a subexpression"""
+        node_id = self._node_ids.get(expr)
+        if node_id is None:
+            node_id = self._node_ids[expr] = f"n{len(self._node_ids)}"
+        return node_id
+        
+    def _node_fragment(self, expr):
+        """DOT statements for one expanded node and the edges to its children"""
+        fragment = self._fragments.get(expr)
+        if fragment is None:
+            node_id = self._node_id(expr)
+            shape = "ellipse" if expr.args else "box"
+            fragment = [f'  {node_id} [label="{_escape(_node_label(expr))}", shape={shape}];']
+            fragment.extend(f"  {node_id} -> {self._node_id(child)};" for child in dict.fromkeys(expr.args))
+            self._fragments[expr] = fragment
+        return fragment
+        
+    def _truncated_fragment(self, expr, hidden, visible):
+        """DOT statements for a node whose extra children share one placeholder"""
+        key = ("truncated", expr, len(hidden))
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            node_id = self._node_id(expr)
+            placeholder_id = f"{node_id}_more"
+            label = _escape(_remainder_label(expr, len(hidden)))
+            fragment = [f'  {node_id} [label="{_escape(_node_label(expr))}", shape=ellipse];']
+            fragment.extend(f"  {node_id} -> {self._node_id(child)};" for child in visible)
+            fragment.append(f'  {placeholder_id} [label="{label}", shape=note, style=filled, fillcolor=lightyellow];')
+            fragment.append(f"  {node_id} -> {placeholder_id};")
+            self._fragments[key] = fragment
+        return fragment
+        
+    def _collapsed_fragment(self, expr):
+        """DOT statement for a subtree collapsed because of the node budget"""
+        key = ("collapsed", expr)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            text = str(expr)
+            if len(text) > 40:
+                text = text[:37] + "..."
+            # Only the descendants are hidden; expr itself is drawn
+            size = sum(1 for _ in sympy.preorder_traversal(expr)) - 1
+            label = _escape(f"{text}\n({size} nodes collapsed)")
+            fragment = [f'  {self._node_id(expr)} [label="{label}", shape=note, style=filled, fillcolor=lightyellow];']
+            self._fragments[key] = fragment
+        return fragment
+        
+    def _render_dot(self, dot_source):
+        """Render DOT source to PNG, reusing the file for identical sources"""
+        digest = hashlib.sha1(dot_source.encode("utf-8")).hexdigest()[:16]
+        output_file = self._rendered.get(digest)
+        if output_file and os.path.exists(output_file):
+            self._rendered.move_to_end(digest)
+            return output_file
+        
+        import graphviz
+        output_file = os.path.join(self.output_dir, f"expression_{digest}.png")
+        
+        # Write to a private file and rename, so another generator rendering
+        # the same diagram never sees a half-written PNG
+        handle, partial_file = tempfile.mkstemp(suffix=".png", dir=self.output_dir)
+        with os.fdopen(handle, "wb") as f:
+            f.write(graphviz.Source(dot_source).pipe(format="png"))
+        os.replace(partial_file, output_file)
+        self._rendered[digest] = output_file
+        self._rendered.move_to_end(digest)
+        if len(self._rendered) > self.max_rendered:
+            self._rendered.popitem(last=False)
+        return output_file
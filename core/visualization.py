@@ -1,13 +1,19 @@
 """
 Data visualization tools for UML Calculator - Community Edition
 """
-import matplotlib.pyplot as plt
+import os
+import tempfile
+
 import numpy as np
+from matplotlib.figure import Figure
 
 def create_plot(x_values, y_values, title="Function Plot", output_file=None):
     """
     Create a plot from x,y data and save to a file
     
+    Uses a standalone Figure rather than pyplot's global current figure, so
+    plots can be created from several threads at once.
+    
     Args:
         x_values: Array of x values
         y_values: Array of y values
@@ -17,34 +23,27 @@ def create_plot(x_values, y_values, title="Function Plot", output_file=None):
     Returns:
         Path to generated image file
     """
-    plt.figure(figsize=(10, 6))
+    figure = Figure(figsize=(10, 6))
+    axes = figure.add_subplot()
     
     # Filter out NaN values for plotting
     mask = ~np.isnan(y_values)
-    plt.plot(x_values[mask], y_values[mask])
+    axes.plot(x_values[mask], y_values[mask])
     
-    plt.title(title)
-    plt.grid(True)
-    plt.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-    plt.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-    plt.xlabel('x')
-    plt.ylabel('y')
+    axes.set_title(title)
+    axes.grid(True)
+    axes.axhline(y=0, color='k', linestyle='-', alpha=0.3)
+    axes.axvline(x=0, color='k', linestyle='-', alpha=0.3)
+    axes.set_xlabel('x')
+    axes.set_ylabel('y')
     
     # Add some margins to the plot
-    plt.margins(0.1)
-    
-    # Save to file if path is provided
-    if output_file:
-        plt.savefig(output_file)
-        plt.close()
-        return output_file
-    
-    # If no file path is provided, create a temporary file
-    import tempfile
-    import os
+    axes.margins(0.1)
     
-    temp_file = os.path.join(tempfile.gettempdir(), "uml_calc_plot.png")
-    plt.savefig(temp_file)
-    plt.close()
+    # If no file path is provided, create a unique temporary file
+    if not output_file:
+        handle, output_file = tempfile.mkstemp(prefix="uml_calc_plot_", suffix=".png")
+        os.close(handle)
     
-    return temp_file
+    figure.savefig(output_file)
+    return output_file
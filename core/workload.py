@@ -0,0 +1,214 @@
+"""
+Synthetic batch workload generator for UML Calculator - Community Edition
+
+Produces reproducible batch CSV files of any size for load testing
+process_batch.py. Rows are generated and written one at a time, so very large
+files never have to fit in memory.
+"""
+import csv
+import random
+
+DEFAULT_MIX = {"calc": 0.6, "ris": 0.3, "solve": 0.1}
+OPERATIONS = ("calc", "ris", "solve", "ris_reduce")
+FUNCTIONS = ("sin", "cos", "exp", "sqrt", "log")
+
+BROKEN_EXPRESSIONS = ("2 +* x", "sin(", "3x^", "((x + 1)", "x ** * 2")
+
+class _Term:
+    """One term of a generated expression: coefficient * f(x)^power"""
+    
+    __slots__ = ("coefficient", "function", "power")
+    
+    def __init__(self, coefficient, function, power):
+        self.coefficient = coefficient
+        self.function = function
+        self.power = power
+    
+    def render(self, rng, variable):
+        """Spell the term, varying notation without changing its value"""
+        if not variable:
+            # Numeric term, e.g. 3^2 or (-7)
+            text = str(self.coefficient) if self.coefficient >= 0 else f"({self.coefficient})"
+            if self.power != 1:
+                text = f"{text}{rng.choice(('^', '**'))}{self.power}"
+            return text
+        
+        base = variable if self.function is None else f"{self.function}({variable})"
+        if self.power != 1:
+            base = f"{base}{rng.choice(('^', '**'))}{self.power}"
+        if self.coefficient == 1:
+            return base
+        if self.function is None and rng.random() < 0.5:
+            return f"{self.coefficient}{base}"  # implicit multiplication
+        return f"{self.coefficient}*{base}"
+
+class WorkloadGenerator:
+    """
+    Deterministic generator of batch rows
+    
+    Args:
+        seed: Random seed - the same seed and options give the same rows
+        mix: Dict of operation name to relative weight
+        complexity: Average number of terms per expression
+        repetition: Probability that an expression repeats an earlier one
+            (spelled differently, but algebraically identical)
+        operand_range: (low, high) range for RIS operands and coefficients
+        error_fraction: Fraction of rows that are deliberately invalid
+        pool_size: Number of distinct expressions remembered for repetition
+    """
+    
+    def __init__(self, seed=0, mix=None, complexity=3, repetition=0.3,
+                 operand_range=(-100, 100), error_fraction=0.0, pool_size=1000):
+        mix = dict(DEFAULT_MIX if mix is None else mix)
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+        if not any(weight > 0 for weight in mix.values()):
+            raise ValueError("Operation mix needs at least one positive weight")
+        
+        self.seed = seed
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.complexity = max(1, complexity)
+        self.repetition = repetition
+        self.operand_range = operand_range
+        self.error_fraction = error_fraction
+        self.pool_size = pool_size
+    
+    @property
+    def fields(self):
+        """CSV header for the generated rows"""
+        if "ris_reduce" in self.operations:
+            return ("operation", "expression", "a", "b", "values")
+        return ("operation", "expression", "a", "b")
+    
+    def rows(self, count):
+        """
+        Generate rows lazily
+        
+        Args:
+            count: Number of rows to generate
+        
+        Yields:
+            Row tuples matching fields
+        """
+        rng = random.Random(self.seed)
+        pools = {"calc": [], "solve": []}
+        width = len(self.fields)
+        
+        for _ in range(count):
+            if rng.random() < self.error_fraction:
+                row = self._error_row(rng)
+            else:
+                operation = rng.choices(self.operations, self.weights)[0]
+                if operation == "ris":
+                    row = ("ris", "", self._operand(rng), self._operand(rng))
+                elif operation == "ris_reduce":
+                    length = rng.randint(2, 2 + 2 * self.complexity)
+                    values = " ".join(str(self._operand(rng)) for _ in range(length))
+                    row = ("ris_reduce", "", "", "", values)
+                else:
+                    row = ("calc", self._expression(rng, operation, pools[operation]), "", "")
+            yield row + ("",) * (width - len(row))
+    
+    def write(self, output, count, flush_every=10_000):
+        """
+        Stream rows to a CSV file
+        
+        Args:
+            output: Path, or file object opened for text writing
+            count: Number of rows to write
+            flush_every: Rows between flushes of the output
+        
+        Returns:
+            Number of rows written
+        """
+        if isinstance(output, str):
+            with open(output, "w", newline="") as f:
+                return self.write(f, count, flush_every)
+        
+        writer = csv.writer(output)
+        writer.writerow(self.fields)
+        written = 0
+        for row in self.rows(count):
+            writer.writerow(row)
+            written += 1
+            if written % flush_every == 0:
+                output.flush()
+        return written
+    
+    def _operand(self, rng):
+        return rng.randint(*self.operand_range)
+    
+    def _expression(self, rng, operation, pool):
+        """Generate a calc expression, or an equation for solve-like rows"""
+        if pool and rng.random() < self.repetition:
+            terms, variable = rng.choice(pool)
+            terms = terms[:]
+            rng.shuffle(terms)
+        else:
+            terms, variable = self._terms(rng, operation)
+            if len(pool) < self.pool_size:
+                pool.append((terms, variable))
+            else:
+                pool[rng.randrange(self.pool_size)] = (terms, variable)
+        
+        rendered = [term.render(rng, variable) for term in terms]
+        expression = rendered[0]
+        for text in rendered[1:]:
+            expression += rng.choice((" + ", "+")) + text
+        
+        if operation == "solve":
+            return f"{expression} = 0"
+        return expression
+    
+    def _terms(self, rng, operation):
+        """Pick the terms of a new expression"""
+        count = max(1, int(rng.gauss(self.complexity, self.complexity / 3) + 0.5))
+        low, high = self.operand_range
+        low, high = max(low, -20), min(high, 20)
+        if low > high:
+            low, high = self.operand_range
+        
+        # Solve-like rows are polynomials in x; calc rows are mostly numeric
+        variable = "x" if operation == "solve" or rng.random() < 0.3 else ""
+        terms = []
+        for degree in range(count):
+            coefficient = rng.randint(low, high) or 1
+            if variable:
+                function = rng.choice(FUNCTIONS) if operation == "calc" and rng.random() < 0.2 else None
+                power = max(1, count - degree)
+            else:
+                function, power = None, rng.choice((1, 1, 2))
+            terms.append(_Term(coefficient, function, power))
+        return terms, variable
+    
+    def _error_row(self, rng):
+        """Generate a row that the batch processor will report as an error"""
+        kind = rng.randrange(3)
+        if kind == 0:
+            return ("calc", rng.choice(BROKEN_EXPRESSIONS), "", "")
+        if kind == 1:
+            return ("ris", "", rng.choice(("abc", "1.5", "")), self._operand(rng))
+        return (rng.choice(("sqrt", "divide", "")), "2 + 2", "", "")
+
+def parse_mix(text):
+    """
+    Parse an operation mix like "calc=6,ris=3,solve=1"
+    
+    Args:
+        text: Comma-separated operation=weight pairs
+    
+    Returns:
+        Dict of operation name to weight
+    """
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        try:
+            operation, weight = part.split("=")
+            mix[operation.strip()] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid mix entry: {part!r}. Use operation=weight")
+    return mix
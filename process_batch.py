@@ -7,73 +7,339 @@ import sys
 import os
 import csv
 import json
+import argparse
+from multiprocessing import Pool
+from time import perf_counter
 
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from core.ris_community import ris
-from core.symbolic import evaluate_expression
+from core.ris_reduce import parse_values, ris_reduce
+from core.symbolic import evaluate_expression, evaluate_parsed, parse_calc_expression, canonicalize_expression
+from core.progress import BatchTelemetry, default_reporter
+from core.records import ResultLog, shared_fields
+from core.profiling import Profiler, PROFILE_MODES
+from core.shm_transport import (SharedResultBuffer, attach_worker, chunk_ranges, worker_buffer,
+                                STATUS_SUCCESS, STATUS_ERROR)
 
-def process_batch_file(file_path, output_path=None):
-    """Process a CSV file with batch calculations"""
-    results = []
+def read_batch_rows(file_path):
+    """
+    Read a batch CSV into a shared header and one tuple per row
+    
+    Args:
+        file_path: Path to the input CSV
+    
+    Returns:
+        (fields, rows) where short rows are padded with None like csv.DictReader
+    """
+    with open(file_path, 'r') as f:
+        reader = csv.reader(f)
+        fields = shared_fields(next(reader, ()))
+        width = len(fields)
+        
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            rows.append(tuple(row))
+    
+    return fields, rows
+
+def column_getter(fields, name, default=''):
+    """Return a function that reads one named column from a row tuple"""
+    if name in fields:
+        index = fields.index(name)
+        return lambda row: row[index]
+    return lambda row: default
+
+def group_calc_expressions(fields, rows):
+    """
+    Group the calc rows of a batch by canonical expression
+    
+    Args:
+        fields: Header of the batch
+        rows: List of row tuples
+    
+    Returns:
+        Dict mapping canonical key to (representative expression, row indices).
+        The key of a parseable expression is the parsed SymPy expression
+        itself, so the group can be evaluated without parsing it again;
+        equations and unparseable text are keyed by their normalized string.
+    """
+    get_operation = column_getter(fields, 'operation')
+    get_expression = column_getter(fields, 'expression')
+    groups = {}
+    canonical_keys = {}
+    
+    for index, row in enumerate(rows):
+        if (get_operation(row) or '').strip().lower() != 'calc':
+            continue
+        
+        expression = get_expression(row) or ''
+        
+        # Only parse each distinct spelling once; SymPy expressions compare
+        # and hash structurally, so equivalent spellings share a key
+        key = canonical_keys.get(expression)
+        if key is None:
+            key = parse_calc_expression(expression)
+            if key is None:
+                key = canonicalize_expression(expression)
+            canonical_keys[expression] = key
+        
+        if key in groups:
+            groups[key][1].append(index)
+        else:
+            groups[key] = (expression, [index])
+    
+    return groups
+
+def evaluate_row(operation, row, getters, parsed=None):
+    """
+    Evaluate one batch row
+    
+    Args:
+        operation: Normalized operation name
+        row: Row tuple
+        getters: (expression, a, b, values) column getters from row_getters
+        parsed: Optional parsed calc expression from group_calc_expressions
+    
+    Returns:
+        (result, status) tuple
+    """
+    get_expression, get_a, get_b, get_values = getters
+    try:
+        if operation == 'calc':
+            if parsed is not None:
+                return evaluate_parsed(parsed), 'success'
+            return evaluate_expression(get_expression(row)), 'success'
+        if operation == 'ris':
+            return ris(int(get_a(row)), int(get_b(row))), 'success'
+        if operation == 'ris_reduce':
+            return ris_reduce(parse_values(get_values(row) or '')), 'success'
+    except Exception as e:
+        return str(e), 'error'
+    return f"Unknown operation: {operation}", 'error'
+
+def row_getters(fields):
+    """Return the column getters evaluate_row needs"""
+    return (
+        column_getter(fields, 'expression'),
+        column_getter(fields, 'a', 0),
+        column_getter(fields, 'b', 0),
+        column_getter(fields, 'values'),
+    )
+
+def _evaluate_chunk(task):
+    """
+    Worker: evaluate a chunk of rows into the shared result buffer
+    
+    Numeric results and timings go to shared memory; only results that do not
+    fit a slot (error messages, solution lists, symbolic expressions) are
+    returned and pickled.
+    """
+    start, fields, rows, parsed = task
+    get_operation = column_getter(fields, 'operation')
+    getters = row_getters(fields)
+    values, status, seconds = [], [], []
+    
+    for row, expr in zip(rows, parsed):
+        started = perf_counter()
+        operation = (get_operation(row) or '').strip().lower()
+        result, row_status = evaluate_row(operation, row, getters, expr)
+        values.append(result)
+        status.append(STATUS_SUCCESS if row_status == 'success' else STATUS_ERROR)
+        seconds.append(perf_counter() - started)
+    
+    pickled = worker_buffer().put_many(start, values, status, seconds)
+    return start, len(rows), pickled
+
+def evaluate_rows_parallel(fields, rows, workers, telemetry=None, row_numbers=None, parsed=None):
+    """
+    Evaluate rows in worker processes with shared-memory result transport
+    
+    Args:
+        fields: Header of the batch
+        rows: List of row tuples to evaluate
+        workers: Number of worker processes
+        telemetry: Optional BatchTelemetry, fed as chunks complete
+        row_numbers: Optional original row number of each row, for telemetry
+        parsed: Optional parsed calc expression (or None) for each row
+    
+    Returns:
+        List of (result, status) tuples in row order
+    """
+    outcomes = [None] * len(rows)
+    parsed = parsed if parsed is not None else [None] * len(rows)
+    get_operation = column_getter(fields, 'operation')
+    
+    with SharedResultBuffer(len(rows)) as buffer:
+        tasks = [
+            (start, fields, rows[start:stop], parsed[start:stop])
+            for start, stop in chunk_ranges(len(rows), workers)
+        ]
+        with Pool(workers, initializer=attach_worker, initargs=(buffer.name, len(rows), 0)) as pool:
+            for start, count, pickled in pool.imap_unordered(_evaluate_chunk, tasks):
+                values = buffer.get_many(start, start + count, pickled)
+                for slot, value, code in zip(range(start, start + count), values, buffer.status[start:start + count]):
+                    outcomes[slot] = (value, 'success' if code == STATUS_SUCCESS else 'error')
+                    if telemetry:
+                        operation = (get_operation(rows[slot]) or '').strip().lower()
+                        row_number = row_numbers[slot] if row_numbers is not None else slot
+                        telemetry.record(row_number, operation, float(buffer.seconds[slot]))
+    
+    return outcomes
+
+def process_batch_file(file_path, output_path=None, dedupe=True, stats=None, telemetry=None, workers=1):
+    """
+    Process a CSV file with batch calculations
+    
+    Args:
+        file_path: Path to the input CSV
+        output_path: Optional path for the JSON results
+        dedupe: Evaluate algebraically identical calc expressions only once
+        stats: Optional dict that receives deduplication statistics
+        telemetry: Optional BatchTelemetry that records per-row latency
+        workers: Number of worker processes; above 1, rows are evaluated in
+            parallel and results return through shared memory
+    
+    Returns:
+        ResultLog of records in input order (records support dict-style access)
+    """
+    results = ResultLog()
     
     try:
-        with open(file_path, 'r') as f:
-            reader = csv.DictReader(f)
+        fields, rows = read_batch_rows(file_path)
+        get_operation = column_getter(fields, 'operation')
+        getters = row_getters(fields)
+        
+        # Pre-pass: group calc rows so each unique expression is evaluated once
+        row_groups = {}
+        calc_outcomes = {}
+        if dedupe:
+            groups = group_calc_expressions(fields, rows)
+            row_groups = {index: key for key, (_, indices) in groups.items() for index in indices}
+            
+            if stats is not None:
+                calc_rows = len(row_groups)
+                stats['calc_rows'] = calc_rows
+                stats['unique_expressions'] = len(groups)
+                stats['dedup_ratio'] = calc_rows / len(groups) if groups else 1.0
+        
+        if telemetry:
+            telemetry.total = len(rows)
+            telemetry.start()
+        
+        if workers > 1:
+            # Only the first row of each calc group is sent to the workers
+            first_rows = {}
+            pending = []
+            for index in range(len(rows)):
+                key = row_groups.get(index)
+                if key not in first_rows:
+                    if key is not None:
+                        first_rows[key] = index
+                    pending.append(index)
             
-            for row in reader:
-                operation = row.get('operation', '').strip().lower()
+            outcomes = evaluate_rows_parallel(fields, [rows[index] for index in pending], workers,
+                                              telemetry, pending,
+                                              [_parsed_key(row_groups.get(index)) for index in pending])
+            outcomes = dict(zip(pending, outcomes))
+            for index, row in enumerate(rows):
+                operation = (get_operation(row) or '').strip().lower()
+                result, status = outcomes[first_rows.get(row_groups.get(index), index)]
+                results.append(operation, fields, row, result, status)
+                if telemetry and index not in outcomes:
+                    # Duplicates were fanned out without being evaluated
+                    telemetry.record(index, operation, 0.0)
+        else:
+            for index, row in enumerate(rows):
+                started = perf_counter()
+                operation = (get_operation(row) or '').strip().lower()
                 
-                if operation == 'calc':
-                    expression = row.get('expression', '')
-                    try:
-                        result = evaluate_expression(expression)
-                        status = 'success'
-                    except Exception as e:
-                        result = str(e)
-                        status = 'error'
-                        
-                elif operation == 'ris':
-                    try:
-                        a = int(row.get('a', 0))
-                        b = int(row.get('b', 0))
-                        result = ris(a, b)
-                        status = 'success'
-                    except Exception as e:
-                        result = str(e)
-                        status = 'error'
+                key = row_groups.get(index) if operation == 'calc' else None
+                if key in calc_outcomes:
+                    # Fan the result of the first evaluation out to duplicates
+                    result, status = calc_outcomes[key]
                 else:
-                    result = f"Unknown operation: {operation}"
-                    status = 'error'
-                    
-                results.append({
-                    'operation': operation,
-                    'inputs': {k: v for k, v in row.items() if k != 'operation'},
-                    'result': result,
-                    'status': status
-                })
+                    result, status = evaluate_row(operation, row, getters, _parsed_key(key))
+                    if key is not None:
+                        calc_outcomes[key] = (result, status)
+                
+                # The record shares the row tuple and header instead of copying them
+                results.append(operation, fields, row, result, status)
+                
+                if telemetry:
+                    telemetry.record(index, operation, perf_counter() - started)
+        
+        if telemetry:
+            telemetry.finish()
         
         # Output results
         if output_path:
             with open(output_path, 'w') as f:
-                json.dump(results, f, indent=2)
+                json.dump(results.to_dicts(), f, indent=2, default=str)
         
         return results
     
     except Exception as e:
+        if telemetry:
+            telemetry.stop()
         print(f"Error processing batch file: {str(e)}")
-        return []
+        return ResultLog()
+
+def _parsed_key(key):
+    """Return the parsed expression behind a group key, or None for text keys"""
+    return None if key is None or isinstance(key, str) else key
+
+def print_telemetry_summary(summary):
+    """Print latency percentiles and the slowest rows of a finished run"""
+    print(f"Throughput: {summary['rows_per_s']:,.0f} rows/s over {summary['elapsed_s']:.2f}s")
+    for operation, latency in sorted(summary['latency'].items()):
+        print(f"  {operation}: p50={latency['p50_ms']}ms p90={latency['p90_ms']}ms "
+              f"p99={latency['p99_ms']}ms ({latency['count']} rows)")
+    if summary['slowest']:
+        print("Slowest rows:")
+        for slow in summary['slowest']:
+            print(f"  row {slow['row']} ({slow['operation']}): {slow['ms']}ms")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python process_batch.py <input_csv> [output_json]")
-        sys.exit(1)
-        
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Process a batch of UML Calculator operations")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_json", nargs="?")
+    parser.add_argument("--no-progress", action="store_true",
+                        help="Disable the progress bar / JSON status lines on stderr")
+    parser.add_argument("--status-interval", type=float, default=1.0,
+                        help="Seconds between progress updates")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Evaluate every calc row, even algebraically identical ones")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; results return through shared memory")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="Profile the run and write PREFIX.txt and PREFIX.collapsed (needs --workers 1)")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default="sampling",
+                        help="Use the low-overhead sampler or cProfile")
+    args = parser.parse_args()
+    if args.profile and args.workers > 1:
+        # The profiler only sees this process, which just waits for the workers
+        parser.error("--profile only covers the main process; run it with --workers 1")
+    
+    input_file = args.input_csv
+    output_file = args.output_json
     
-    results = process_batch_file(input_file, output_file)
+    telemetry = None
+    if not args.no_progress:
+        telemetry = BatchTelemetry(0, default_reporter(), interval=args.status_interval)
+    
+    profiler = Profiler(args.profile, args.profile_mode).start() if args.profile else None
+    
+    stats = {}
+    results = process_batch_file(input_file, output_file, dedupe=not args.no_dedupe, stats=stats,
+                                 telemetry=telemetry, workers=args.workers)
+    
+    profile_reports = profiler.stop() if profiler else None
     
     # Print summary
     success_count = sum(1 for r in results if r['status'] == 'success')
@@ -83,5 +349,15 @@ if __name__ == "__main__":
     print(f"Success: {success_count}")
     print(f"Errors: {error_count}")
     
+    if stats.get('calc_rows'):
+        print(f"Unique expressions: {stats['unique_expressions']} of {stats['calc_rows']} "
+              f"(dedup ratio {stats['dedup_ratio']:.2f}x)")
+    
+    if telemetry and telemetry.summary:
+        print_telemetry_summary(telemetry.summary)
+    
     if output_file:
         print(f"Results saved to {output_file}")
+    
+    if profile_reports:
+        print(f"Profile written to {profile_reports[0]} and {profile_reports[1]}")
@@ -19,6 +19,9 @@ setup(
         "pydot>=1.4.2",
         "graphviz>=0.16"
     ],
+    extras_require={
+        "fast": ["numexpr>=2.7"],
+    },
     entry_points={
         "console_scripts": [
             "umlcalc=calculator:app",
@@ -2,14 +2,38 @@
 UML Calculator - Community Edition Tests
 """
 import unittest
+from unittest import mock
 import sys
 import os
+import tempfile
+import shutil
+import io
+import json
+import time
 
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.ris_community import ris
-from core.symbolic import evaluate_expression, solve_equation
+import functools
+import threading
+import random
+import numpy as np
+from rich.console import Console
+from core.ris_community import ris, ris_vectorized, ris_explain, ris_explain_batch, render_explanation, register_rule, unregister_rule, rules
+from core.ris_reduce import ris_reduce, ris_scan, ris_reduce_tree, ris_reduce_many
+from core import symbolic
+from core.symbolic import evaluate_expression, solve_equation, canonicalize_expression, generate_plot_data
+from core.kernels import NUMEXPR_AVAILABLE
+from core.plot_cache import PlotSampleStore
+from core.profiling import Profiler
+from core.progress import BatchTelemetry, JsonStatusReporter
+from core.records import ResultLog, ResultRecord
+from core.shm_transport import SharedResultBuffer, generate_plot_data_many
+from core.templates import ExpressionTemplate
+from core.uml_generator import UMLGenerator
+from core.workload import WorkloadGenerator, parse_mix
+from process_batch import process_batch_file, print_telemetry_summary
+from ui.session import CalculatorSession, ascii_plot
 
 class TestRisCommunity(unittest.TestCase):
     """Test cases for RIS Community Edition"""
@@ -31,6 +55,102 @@ class TestRisCommunity(unittest.TestCase):
         
         # Default case
         self.assertEqual(ris(7, 4), 11)
+    
+    def test_builtin_rule_order(self):
+        """Test that the built-in rules are registered in priority order"""
+        self.assertEqual([rule.name for rule in rules()], ["zero", "equal", "divisible", "special", "default"])
+        
+    def test_registered_rule(self):
+        """Test that a new rule reaches the scalar, vectorized and explain paths"""
+        register_rule(
+            "both_negative", "a < 0 and b < 0", lambda a, b: -(a * b),
+            mask=lambda a, b: (a < 0) & (b < 0), vector_action=lambda a, b: -(a * b),
+            template="Both negative, RIS negates the product: {a}, {b} -> {result}", priority=50,
+        )
+        try:
+            self.assertEqual(ris(-2, -3), -6)
+            self.assertEqual(ris(-2, -2), -4)  # checked before the equal rule
+            self.assertEqual(ris(7, 4), 11)
+            self.assertTrue(ris_explain(-2, -3)[1].startswith("Both negative, RIS negates the product: -2, -3 -> -6"))
+            np.testing.assert_array_equal(ris_vectorized([-2, -2, 7], [-3, 4, 4]), [-6, 2, 11])
+        finally:
+            unregister_rule("both_negative")
+        
+        # The compiled dispatch is rebuilt without the rule
+        self.assertEqual(ris(-2, -3), 6)
+        
+    def test_rule_codes_are_not_reused(self):
+        """Test that explanations keep their rule after it is unregistered"""
+        first = register_rule("first", "a == 41", "0", template="First rule: {a}, {b} -> {result}", priority=50)
+        batch = ris_explain_batch([(41, 1)])
+        unregister_rule("first")
+        second = register_rule("second", "a == 42", "0", template="Second rule", priority=50)
+        self.addCleanup(unregister_rule, "second")
+        
+        self.assertNotEqual(first, second)
+        self.assertTrue(batch.explanation(0).startswith("First rule: 41, 1 -> 0"))
+        with self.assertRaises(ValueError):
+            render_explanation(second + 1000, 1, 2, 3)
+        
+    def test_rule_without_vector_functions(self):
+        """Test that vectorized dispatch falls back to the scalar definition"""
+        register_rule("seven", lambda a, b: a == 7, "a - b", priority=150)
+        self.addCleanup(unregister_rule, "seven")
+        
+        self.assertEqual(ris(7, 4), 3)
+        np.testing.assert_array_equal(ris_vectorized([7, 6, 0], [4, 4, 7]), [3, 24, 7])
+        with self.assertRaises(ValueError):
+            register_rule("seven", "True", "a")
+
+class TestRisExplain(unittest.TestCase):
+    """Test cases for RIS explanations"""
+    
+    def test_explanation_text(self):
+        """Test the explanation text for one operation"""
+        result, explanation = ris_explain(10, 5)
+        self.assertEqual(result, 2)
+        self.assertTrue(explanation.startswith("When a is divisible by b, RIS performs Division: 10 ÷ 5 = 2.0\n\nNote:"))
+        
+    def test_batch_matches_single(self):
+        """Test that batched explanations render exactly like ris_explain"""
+        pairs = [(a, b) for a in range(-9, 10) for b in range(-9, 10)]
+        batch = ris_explain_batch(pairs)
+        
+        self.assertEqual(len(batch), len(pairs))
+        self.assertEqual(batch.results, [ris(a, b) for a, b in pairs])
+        self.assertEqual(list(batch), [ris_explain(a, b) for a, b in pairs])
+        self.assertEqual(batch.render_all()[5], ris_explain(*pairs[5])[1])
+
+class TestRisReduce(unittest.TestCase):
+    """Test cases for RIS reductions"""
+    
+    def test_vectorized_matches_scalar(self):
+        """Test that vectorized RIS applies the same rules as ris()"""
+        pairs = [(a, b) for a in range(-12, 13) for b in range(-12, 13)]
+        expected = [ris(a, b) for a, b in pairs]
+        result = ris_vectorized([a for a, _ in pairs], [b for _, b in pairs])
+        self.assertEqual(list(result), expected)
+        
+    def test_sequence_reduction(self):
+        """Test left-fold reduction, prefix scan and operand trees"""
+        self.assertEqual(ris_reduce([6, 3, 2, 9]), ris(ris(ris(6, 3), 2), 9))
+        self.assertEqual(ris_scan([6, 3, 2, 9]), [6, 2, 4, 13])
+        self.assertEqual(ris_reduce_tree([1, [2, 3], 4]), ris(ris(1, ris(2, 3)), 4))
+        with self.assertRaises(ValueError):
+            ris_reduce([])
+            
+    def test_many_sequences(self):
+        """Test that vectorized reduction of many sequences matches a left fold"""
+        rng = random.Random(7)
+        sequences = [[rng.randint(-20, 20) for _ in range(rng.randint(1, 10))] for _ in range(500)]
+        
+        reduced = ris_reduce_many(sequences)
+        self.assertEqual(list(reduced), [functools.reduce(ris, s) for s in sequences])
+        
+        prefixes = ris_reduce_many(sequences, scan=True)
+        for row, sequence in zip(prefixes, sequences):
+            self.assertEqual(list(row[:len(sequence)]), ris_scan(sequence))
+            self.assertTrue(np.isnan(row[len(sequence):]).all())
 
 class TestSymbolic(unittest.TestCase):
     """Test cases for symbolic calculations"""
@@ -47,6 +167,606 @@ class TestSymbolic(unittest.TestCase):
             self.assertEqual(set([float(s) for s in solutions]), {-2.0, 2.0})
         else:
             self.fail("Expected list of solutions")
+            
+    def test_numeric_solving(self):
+        """Test numeric equation solving"""
+        self.assertEqual(solve_equation("x^2 - 4 = 0", method="numeric"), [-2.0, 2.0])
+        self.assertEqual(solve_equation("x^2 + 1", method="numeric"), ["-I", "I"])
+        self.assertEqual(solve_equation("(x-1)^2*(x+3)", method="numeric"), [-3.0, 1.0])
+        self.assertAlmostEqual(solve_equation("cos(x) = x", method="numeric"), 0.7390851332151607)
+        
+        roots = solve_equation("sin(x)", method="numeric", x_range=(-10, 10))
+        self.assertEqual(len(roots), 7)
+        self.assertAlmostEqual(roots[-1], 3 * 3.141592653589793)
+        
+    def test_numeric_solving_without_derivative(self):
+        """Test that functions without a usable derivative are bisected"""
+        self.assertEqual(solve_equation("Abs(x) - 2"), [-2.0, 2.0])
+        self.assertEqual(solve_equation("sign(x)*x - 2", method="numeric"), [-2.0, 2.0])
+        roots = solve_equation("Abs(x - 0.3) - 1.7", method="numeric")
+        self.assertAlmostEqual(roots[0], -1.4)
+        self.assertAlmostEqual(roots[1], 2.0)
+        
+    def test_numeric_solving_rejects_false_roots(self):
+        """Test that near misses, underflow and tiny complex roots are not real roots"""
+        self.assertEqual(solve_equation("cos(x) + 1.000000001", method="numeric", x_range=(-10, 10)), [])
+        self.assertEqual(solve_equation("exp(-x^2)", method="numeric"), [])
+        self.assertEqual(solve_equation("x^2 + 1e-20", method="numeric"), ["-1e-10*I", "1e-10*I"])
+        
+        roots = solve_equation("cos(x) + 1", method="numeric", x_range=(-10, 10))
+        self.assertEqual(len(roots), 4)
+        self.assertAlmostEqual(roots[2], 3.141592653589793, places=6)
+        
+    def test_high_degree_polynomial(self):
+        """Test that high-degree polynomials are solved numerically"""
+        solutions = solve_equation("x^7 - 3x^2 + 1")
+        self.assertEqual(len(solutions), 7)
+        real_roots = [s for s in solutions if isinstance(s, float)]
+        self.assertEqual(len(real_roots), 3)
+        for root in real_roots:
+            self.assertAlmostEqual(root ** 7 - 3 * root ** 2 + 1, 0.0)
+
+class TestExpressionTemplates(unittest.TestCase):
+    """Test cases for parameterized expression templates"""
+    
+    def test_evaluate_and_plot(self):
+        """Test vectorized evaluation over coefficient rows"""
+        template = ExpressionTemplate("a*x^2 + b*x + c")
+        self.assertEqual(template.params, ("a", "b", "c"))
+        rows = np.array([[1, 0, -4], [2, 3, 1], [0, 0, 5]])
+        
+        np.testing.assert_array_equal(template.evaluate(rows, 2.0), [0.0, 15.0, 5.0])
+        np.testing.assert_array_equal(template.evaluate({"a": [1, 2], "b": 0, "c": 1}, [1.0, 3.0]), [2.0, 19.0])
+        
+        x_values, y_values = template.plot(rows, -1, 1, 11)
+        self.assertEqual(y_values.shape, (3, 11))
+        np.testing.assert_allclose(y_values[1], generate_plot_data("2*x^2 + 3*x + 1", -1, 1, 11)[1])
+        
+        self.assertTrue(np.isnan(ExpressionTemplate("sqrt(k - x)").evaluate([[1.0], [4.0]], 2.0)[0]))
+        with self.assertRaises(ValueError):
+            template.evaluate({"a": 1, "b": 2})
+        
+    def test_solve_matches_per_row(self):
+        """Test that closed forms reused across rows match solve_equation row by row"""
+        template = ExpressionTemplate("a*x^2 + b*x = -c")
+        rows = [[1, 0, -4], [1, 2, 1], [1, 0, 1], [0, 2, -4], [2, -3, 1], [-1, 0, 4]]
+        expected = [solve_equation(f"{a}*x^2 + {b}*x + {c}") for a, b, c in rows]
+        self.assertEqual(template.solve(rows), expected)
+        
+        cubic = ExpressionTemplate("x^3 + p*x + q")
+        self.assertEqual(cubic.solve({"p": [-1, -7, 0], "q": [0, 6, -8]}),
+                         [[-1.0, 0.0, 1.0], [-3.0, 1.0, 2.0], solve_equation("x^3 - 8")])
+        
+        # Multi-letter parameter names must be declared so they are not split
+        self.assertEqual(ExpressionTemplate("k1 x + k2", params=["k1", "k2"]).solve([[2, -4]]), [2.0])
+        with self.assertRaises(ValueError):
+            ExpressionTemplate("a*x + b", params=["a"])
+        
+    def test_identically_zero_rows_fall_back(self):
+        """Test that rows making the template identically zero are solved per row"""
+        self.assertEqual(ExpressionTemplate("a*x").solve([[0], [2]]), [solve_equation("0*x"), 0.0])
+        rows = [[0, 0, 0], [0, 0, 1], [1, 0, -4]]
+        self.assertEqual(ExpressionTemplate("a*x^2 + b*x + c").solve(rows),
+                         [solve_equation(f"{a}*x^2 + {b}*x + {c}") for a, b, c in rows])
+
+class TestPlotBackends(unittest.TestCase):
+    """Test cases for plot evaluation backends"""
+    
+    def test_backends_agree(self):
+        """Test that every backend produces the same values"""
+        backends = ["numpy", "chunked"] + (["numexpr"] if NUMEXPR_AVAILABLE else [])
+        x_ref, y_ref = generate_plot_data("x^2 + sin(x)", -5, 5, 100001, backend="numpy")
+        for backend in backends + ["auto"]:
+            x_values, y_values = generate_plot_data("x^2 + sin(x)", -5, 5, 100001, backend=backend)
+            self.assertTrue((x_values == x_ref).all())
+            self.assertLess(abs(y_values - y_ref).max(), 1e-9, backend)
+            
+    def test_piecewise_functions_fall_back(self):
+        """Test that auto leaves numexpr for functions it cannot run"""
+        for expression, points in (("Max(x,0)*x + sin(x)", 20000), ("sign(x)", 100000)):
+            x_values, y_values = generate_plot_data(expression, -5, 5, points)
+            _, y_ref = generate_plot_data(expression, -5, 5, points, backend="numpy")
+            self.assertTrue((y_values == y_ref).all(), expression)
+        self.assertAlmostEqual(solve_equation("Max(x,0)*x - 4", method="numeric"), 2.0)
+    
+    def test_constant_expression(self):
+        """Test that constant expressions produce one value per point"""
+        x_values, y_values = generate_plot_data("5", 0, 1, 4, backend="chunked")
+        self.assertEqual(list(y_values), [5.0] * 4)
+        
+    def test_unknown_backend(self):
+        """Test that unknown backends are rejected"""
+        with self.assertRaises(ValueError):
+            generate_plot_data("x", 0, 1, 4, backend="bogus")
+
+class TestPlotSampleStore(unittest.TestCase):
+    """Test cases for incremental plot sampling"""
+    
+    def test_pan_evaluates_only_new_range(self):
+        """Test that an overlapping range only evaluates the uncovered part"""
+        store = PlotSampleStore()
+        store.sample("x^2", -10, 10, 501)
+        x_values, y_values = store.sample("x**2", 0, 20, 501)
+        
+        self.assertEqual(store.evaluated_points, 501 + 251)
+        self.assertEqual((x_values[0], x_values[-1]), (0.0, 20.0))
+        self.assertTrue(((x_values[1:] - x_values[:-1]) > 0).all())
+        self.assertLess(abs(y_values - x_values ** 2).max(), 1e-9)
+        
+    def test_zoom_in_reuses_dense_samples(self):
+        """Test that zooming into a densely sampled range evaluates nothing"""
+        store = PlotSampleStore()
+        store.sample("sin(x)", -10, 10, 2001)
+        x_values, y_values = store.sample("sin(x)", -1, 1, 100)
+        
+        self.assertEqual(store.evaluated_points, 2001)
+        self.assertGreaterEqual(len(x_values), 100)
+        
+    def test_zoom_in_refines_sparse_samples(self):
+        """Test that zooming in beyond the cached density adds samples"""
+        store = PlotSampleStore()
+        store.sample("x^3", -10, 10, 21)
+        x_values, y_values = store.sample("x^3", -1, 1, 201)
+        
+        self.assertGreater(store.evaluated_points, 21)
+        self.assertLessEqual((x_values[1:] - x_values[:-1]).max(), 0.01 + 1e-12)
+        
+    def test_samples_persist_across_stores(self):
+        """Test that a new store, e.g. a new CLI run, reuses saved samples"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        PlotSampleStore(cache_dir=directory).sample("x^2", -10, 10, 501)
+        
+        store = PlotSampleStore(cache_dir=directory)
+        x_values, y_values = store.sample("x**2", 0, 20, 501)
+        self.assertEqual(store.evaluated_points, 251)
+        self.assertLess(abs(y_values - x_values ** 2).max(), 1e-9)
+        
+        other_backend = PlotSampleStore(cache_dir=directory)
+        other_backend.sample("x^2", 0, 20, 501, backend="chunked")
+        self.assertEqual(other_backend.evaluated_points, 501)
+
+class TestResultRecords(unittest.TestCase):
+    """Test cases for compact result records"""
+    
+    def test_batch_record(self):
+        """Test that batch records convert to the batch result layout"""
+        log = ResultLog()
+        record = log.append("ris", ("operation", "a", "b"), ("ris", "6", "3"), 18, "success")
+        
+        self.assertEqual(record["operation"], "ris")
+        self.assertEqual(record["inputs"], {"a": "6", "b": "3"})
+        self.assertEqual(log.to_dicts(), [
+            {"operation": "ris", "inputs": {"a": "6", "b": "3"}, "result": 18, "status": "success"}
+        ])
+        self.assertFalse(hasattr(record, "__dict__"))
+        
+    def test_history_record(self):
+        """Test that history records keep their timestamp and omit the status"""
+        log = ResultLog()
+        log.append_inputs("calc", {"expression": "2+3"}, 5.0, timestamp=0)
+        entry = log.to_dicts()[0]
+        
+        self.assertEqual(list(entry), ["timestamp", "operation", "inputs", "result"])
+        self.assertIn("T", entry["timestamp"])
+        self.assertEqual(entry["inputs"], {"expression": "2+3"})
+        self.assertIsInstance(log[0], ResultRecord)
+
+class TestExpressionDiagrams(unittest.TestCase):
+    """Test cases for expression-tree diagrams"""
+    
+    def test_shared_subexpressions(self):
+        """Test that repeated subexpressions become a single node"""
+        generator = UMLGenerator()
+        dag = generator.build_expression_dag("sin(x^2) + cos(x^2) + x^2")
+        labels = sorted(str(expr) for expr in dag.nodes)
+        
+        self.assertEqual(labels.count("x**2"), 1)
+        self.assertEqual(len(dag.nodes), 6)
+        self.assertEqual(dag.collapsed, [])
+        
+    def test_node_budget(self):
+        """Test that large trees are collapsed to fit the node budget"""
+        generator = UMLGenerator()
+        expression = " + ".join(f"sin(x^{i})*cos({i}*x)" for i in range(1, 30))
+        dag = generator.build_expression_dag(expression, max_nodes=50)
+        
+        self.assertLessEqual(len(dag.nodes) + len(dag.collapsed), 50)
+        self.assertTrue(dag.collapsed)
+        self.assertIn("nodes collapsed", generator.expression_dot(dag))
+        
+        dag = generator.build_expression_dag("sin(x + 1) + 2", max_nodes=3)
+        self.assertEqual([str(expr) for expr in dag.collapsed], ["sin(x + 1)"])
+        self.assertIn("(3 nodes collapsed)", generator.expression_dot(dag))
+        
+    def test_repeated_arguments_share_one_edge(self):
+        """Test that an argument used twice by one node is drawn with one edge"""
+        generator = UMLGenerator()
+        dag = generator.build_expression_dag("x^x + 1")
+        dot = generator.expression_dot(dag)
+        self.assertEqual(dot.count("->"), dag.edge_count)
+        self.assertEqual(dag.edge_count, 3)
+        
+    def test_node_wider_than_budget(self):
+        """Test that children beyond the budget share one placeholder"""
+        generator = UMLGenerator()
+        expression = " + ".join(f"{i}*x^{i}" for i in range(1, 80))
+        dag = generator.build_expression_dag(expression, max_nodes=60)
+        
+        self.assertEqual(len(dag.nodes) + len(dag.collapsed) + len(dag.truncated), 60)
+        self.assertEqual(len(dag.truncated[dag.root]), 21)
+        dot = generator.expression_dot(dag)
+        self.assertIn("21 more terms", dot)
+        self.assertEqual(dot.count("->"), dag.edge_count)
+        
+        rendered = []
+        stats = {}
+        with mock.patch.object(generator, "_render_dot", side_effect=lambda source: rendered.append(source) or str(len(rendered))):
+            pages = generator.generate_expression_pages(expression, max_nodes=60, max_pages=3, stats=stats)
+        self.assertEqual(len(pages), 3)
+        self.assertIn('label="+"', rendered[1])  # the merged terms get the next page
+        self.assertEqual(stats["pages"], 3)
+        self.assertGreater(stats["skipped_subtrees"], 0)
+        
+    def test_dot_fragments_are_cached(self):
+        """Test that repeat renders reuse the cached subtree statements"""
+        generator = UMLGenerator()
+        first = generator.expression_dot(generator.build_expression_dag("x^2 + 2*x"))
+        fragments = len(generator._fragments)
+        second = generator.expression_dot(generator.build_expression_dag("2x + x^2"))
+        
+        self.assertEqual(first, second)
+        self.assertEqual(len(generator._fragments), fragments)
+        
+    def test_caches_are_bounded(self):
+        """Test that a long-lived generator does not grow without bound"""
+        generator = UMLGenerator(max_cached_nodes=30)
+        for i in range(20):
+            generator.expression_dot(generator.build_expression_dag(f"sin({i}*x) + x^{i + 2}"))
+            self.assertLessEqual(len(generator._node_ids), 30 + 10)
+        
+        # A render after a reset is still self-consistent
+        dot = generator.expression_dot(generator.build_expression_dag("sin(x) + cos(x)"))
+        node_ids = {line.split()[0] for line in dot.splitlines() if "[label=" in line}
+        edge_ids = {part.strip(" ;") for line in dot.splitlines() if "->" in line for part in line.split("->")}
+        self.assertLessEqual(edge_ids, node_ids)
+
+class TestWorkloadGenerator(unittest.TestCase):
+    """Test cases for the synthetic workload generator"""
+    
+    def test_reproducible(self):
+        """Test that the same seed produces the same file"""
+        outputs = []
+        for _ in range(2):
+            stream = io.StringIO()
+            WorkloadGenerator(seed=42, error_fraction=0.1).write(stream, 200)
+            outputs.append(stream.getvalue())
+        
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(len(outputs[0].splitlines()), 201)
+        
+        stream = io.StringIO()
+        WorkloadGenerator(seed=43, error_fraction=0.1).write(stream, 200)
+        self.assertNotEqual(stream.getvalue(), outputs[0])
+        
+    def test_operation_mix(self):
+        """Test that the mix, equations and error rows follow the knobs"""
+        generator = WorkloadGenerator(seed=1, mix=parse_mix("calc=1,ris=1,solve=2"), error_fraction=0.0)
+        rows = list(generator.rows(2000))
+        
+        ris_rows = sum(1 for row in rows if row[0] == "ris")
+        equations = sum(1 for row in rows if row[0] == "calc" and "=" in row[1])
+        self.assertTrue(400 < ris_rows < 600)
+        self.assertTrue(900 < equations < 1100)
+        for row in rows:
+            if row[0] == "ris":
+                self.assertTrue(-100 <= row[2] <= 100)
+        
+    def test_rows_process_cleanly(self):
+        """Test that generated rows are valid batch input"""
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        WorkloadGenerator(seed=5, repetition=0.8, mix={"calc": 1, "ris_reduce": 1}).write(path, 60)
+        
+        stats = {}
+        results = process_batch_file(path, stats=stats)
+        self.assertEqual(len(results), 60)
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertGreater(stats["dedup_ratio"], 1.0)
+
+class TestProfiling(unittest.TestCase):
+    """Test cases for the hot-path profiler"""
+    
+    def _profile(self, mode):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        profiler = Profiler(os.path.join(directory, "run"), mode=mode, interval=0.001)
+        with profiler:
+            for i in range(40):
+                evaluate_expression(f"{i}*x^2 + sin(x) + {i}")
+                solve_equation(f"x^2 - {i + 1} = 0")
+        return profiler
+    
+    def test_sampling_reports(self):
+        """Test that the sampler writes a hot-path report and collapsed stacks"""
+        profiler = self._profile("sampling")
+        self.assertGreater(profiler.sampler.samples, 0)
+        
+        labels = [label for label, _, _ in profiler.hot_path_summary()]
+        self.assertIn("parse_expr", labels)
+        
+        with open(profiler.output_prefix + ".txt") as f:
+            report = f.read()
+        self.assertIn("Time per core function", report)
+        self.assertIn("parse_expr", report)
+        
+        with open(profiler.output_prefix + ".collapsed") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        total = 0
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack)
+            total += int(count)
+        self.assertEqual(total, profiler.sampler.samples)
+        
+    def test_sampling_shares_scale_to_wall_time(self):
+        """Test that sampled time follows the share of samples, not the nominal interval"""
+        profiler = Profiler("unused", interval=0.005)
+        parse_frame = ("parse_expr (sympy_parser.py:1)", "/lib/sympy/parsing/sympy_parser.py", "parse_expr")
+        other_frame = ("run (other.py:1)", "/app/other.py", "run")
+        profiler.sampler.stacks.update({(other_frame, parse_frame): 30, (other_frame,): 70})
+        profiler.sampler.samples = 100
+        profiler.sampler.sampled_seconds = profiler.elapsed = 2.0
+        
+        self.assertEqual(profiler.hot_path_summary(), [("parse_expr", 0.6, 30.0)])
+        self.assertAlmostEqual(profiler.sampler.achieved_interval, 0.02)
+        self.assertIn("every 20.0ms (requested 5.0ms)", profiler.text_report())
+        
+    def test_cprofile_mode(self):
+        """Test that cProfile mode reports exact timings and rejects unknown modes"""
+        profiler = self._profile("cprofile")
+        summary = {label: seconds for label, seconds, _ in profiler.hot_path_summary()}
+        self.assertGreater(summary["parse_expr"], 0)
+        self.assertGreater(summary["sympy.solve"], 0)
+        with open(profiler.output_prefix + ".txt") as f:
+            self.assertIn("sorted by cumulative time", f.read())
+        
+        with self.assertRaises(ValueError):
+            Profiler("unused", mode="tracing")
+
+class TestSharedResultBuffer(unittest.TestCase):
+    """Test cases for the shared-memory result transport"""
+    
+    def test_scalars_and_fallback(self):
+        """Test that numbers round-trip through shared memory and the rest is handed back"""
+        values = [3, 2.5, np.float64(-1.0), 2 ** 70, "error text", [1.0, 2.0], True]
+        with SharedResultBuffer(len(values)) as buffer:
+            pickled = buffer.put_many(0, values, [0, 0, 0, 0, 1, 0, 0])
+            self.assertEqual(sorted(pickled), [3, 4, 5, 6])
+            
+            # A second process attaches by name and sees the same slots
+            attached = SharedResultBuffer(len(values), name=buffer.name)
+            back = attached.get_many(0, len(values), pickled)
+            attached.close()
+            
+            self.assertEqual(back, values)
+            self.assertIs(type(back[0]), int)
+            self.assertIs(back[6], True)
+            self.assertEqual(list(buffer.status), [0, 0, 0, 0, 1, 0, 0])
+            self.assertTrue(buffer.put(1, 7))
+            self.assertFalse(buffer.put(1, "x"))
+            self.assertIsNone(buffer.get(1))
+    
+    def test_arrays(self):
+        """Test arena arrays and the multi-process plot helper"""
+        with SharedResultBuffer(2, 10) as buffer:
+            buffer.put_array(1, np.arange(4.0), 6)
+            np.testing.assert_array_equal(buffer.get(1), np.arange(4.0))
+            with self.assertRaises(ValueError):
+                buffer.put_array(0, np.arange(8.0), 6)
+        
+        expressions = ["x^2", "sin(x)", "sin(", "2*x + 1"]
+        x_values, y_values, errors = generate_plot_data_many(expressions, -2, 2, 50, workers=2)
+        self.assertEqual(y_values.shape, (4, 50))
+        self.assertEqual(list(errors), [2])
+        self.assertTrue(np.isnan(y_values[2]).all())
+        np.testing.assert_array_equal(y_values[3], 2 * x_values + 1)
+        np.testing.assert_array_equal(y_values[1], generate_plot_data("sin(x)", -2, 2, 50)[1])
+
+class TestBatchProcessing(unittest.TestCase):
+    """Test cases for batch processing"""
+    
+    def write_batch(self, content):
+        """Write a temporary batch CSV and return its path"""
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+        
+    def test_canonical_expressions(self):
+        """Test that equivalent spellings share a canonical key"""
+        self.assertEqual(canonicalize_expression("x^2+2*x"), canonicalize_expression("2x + x^2"))
+        self.assertNotEqual(canonicalize_expression("x^2"), canonicalize_expression("x^3"))
+        
+    def test_duplicate_expressions(self):
+        """Test that duplicate calc rows are evaluated once and fanned out"""
+        path = self.write_batch(
+            "operation,expression,a,b\n"
+            "calc,2 + 3*5,,\n"
+            "calc,3*5+2,,\n"
+            "ris,,6,3\n"
+            "calc,2 +* x,,\n"
+            "calc,2 + 3*5,,\n"
+        )
+        stats = {}
+        results = process_batch_file(path, stats=stats)
+        
+        self.assertEqual([r['status'] for r in results], ['success', 'success', 'success', 'error', 'success'])
+        self.assertEqual([r['result'] for r in results if r['operation'] == 'calc' and r['status'] == 'success'], [17.0] * 3)
+        self.assertEqual(stats['calc_rows'], 4)
+        self.assertEqual(stats['unique_expressions'], 2)
+        self.assertAlmostEqual(stats['dedup_ratio'], 2.0)
+    
+    def test_short_calc_row(self):
+        """Test that a calc row without an expression is one error, not a failed batch"""
+        path = self.write_batch("operation,expression,a,b\ncalc\nris,,6,3\ncalc,2+3,,\n")
+        for dedupe in (True, False):
+            results = process_batch_file(path, dedupe=dedupe)
+            self.assertEqual([r['status'] for r in results], ['error', 'success', 'success'])
+            self.assertEqual(results[2]['result'], 5.0)
+    
+    def test_dedupe_parses_each_spelling_once(self):
+        """Test that deduplicated rows are evaluated from the pre-pass parse"""
+        content = "operation,expression,a,b\n" + "calc,x^2 + 2x,,\ncalc,2*x+x**2,,\ncalc,4^2,,\ncalc,x =,,\n" * 3
+        path = self.write_batch(content)
+        with mock.patch("core.symbolic.parse_expr", wraps=symbolic.parse_expr) as parse:
+            deduped = process_batch_file(path)
+        self.assertEqual(parse.call_count, 4)
+        
+        plain = process_batch_file(path, dedupe=False)
+        self.assertEqual([(str(r['result']), r['status']) for r in deduped],
+                         [(str(r['result']), r['status']) for r in plain])
+    
+    def test_json_output(self):
+        """Test that results, including symbolic ones, are written as JSON"""
+        path = self.write_batch("operation,expression,a,b\ncalc,x + x,,\nris,,7,7\n")
+        output_path = path + ".json"
+        self.addCleanup(os.remove, output_path)
+        process_batch_file(path, output_path)
+        
+        with open(output_path) as f:
+            results = json.load(f)
+        self.assertEqual(results[0]["result"], "2*x")
+        self.assertEqual(results[1], {
+            "operation": "ris", "inputs": {"expression": "", "a": "7", "b": "7"},
+            "result": 49, "status": "success"
+        })
+        
+    def test_progress_telemetry(self):
+        """Test that telemetry records every row and writes JSON status lines"""
+        path = self.write_batch("operation,expression,a,b\n" + "ris,,6,3\ncalc,2 + 3,,\n" * 50)
+        stream = io.StringIO()
+        telemetry = BatchTelemetry(0, JsonStatusReporter(stream), interval=0, check_every=10)
+        results = process_batch_file(path, telemetry=telemetry)
+        
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0], {"event": "start", "total": 100})
+        self.assertEqual([line["event"] for line in lines[1:-1]], ["progress"] * 10)
+        self.assertEqual(lines[-1]["event"], "done")
+        self.assertEqual(lines[-1]["rows"], len(results))
+        self.assertEqual(telemetry.summary["latency"]["ris"]["count"], 50)
+        self.assertEqual(len(telemetry.summary["slowest"]), 5)
+        
+        slowest = telemetry.summary["slowest"][0]
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            print_telemetry_summary(telemetry.summary)
+        self.assertIn(f"  row {slowest['row']} ({slowest['operation']})", stdout.getvalue())
+        self.assertEqual(lines[-1]["slowest"][0]["row"], slowest["row"])
+    
+    def test_progress_for_slow_rows(self):
+        """Test that slow and stuck rows still produce status updates"""
+        stream = io.StringIO()
+        telemetry = BatchTelemetry(12, JsonStatusReporter(stream), interval=0.05)
+        telemetry.start()
+        for index in range(10):
+            time.sleep(0.01)
+            telemetry.record(index, "solve", 0.01)
+        time.sleep(0.3)  # one row that takes many intervals
+        telemetry.record(10, "solve", 0.3)
+        telemetry.finish()
+        
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        progress = [line for line in lines if line["event"] == "progress"]
+        self.assertGreaterEqual(len(progress), 5)
+        self.assertTrue(any(line["rows"] == 10 and line["stalled_s"] >= 0.1 for line in progress))
+        self.assertEqual(lines[-1]["event"], "done")
+    
+    def test_worker_processes(self):
+        """Test that worker processes give the same results as a serial run"""
+        path = self.write_batch(
+            "operation,expression,a,b,values\n"
+            + "calc,2 + 3*5,,,\n"
+            + "ris,,10,4,\n" * 150
+            + "calc,3*5+2,,,\n"
+            + "calc,x^2 - 4 = 0,,,\n"
+            + "ris,,abc,3,\n"
+            + "ris_reduce,,,,6 3 2 9\n"
+            + "sqrt,,,,\n"
+        )
+        serial = process_batch_file(path)
+        telemetry = BatchTelemetry(0, None, check_every=1)
+        parallel = process_batch_file(path, workers=2, telemetry=telemetry)
+        
+        self.assertEqual(parallel.to_dicts(), serial.to_dicts())
+        self.assertEqual(telemetry.summary['rows'], len(serial))
+        self.assertEqual(parallel[152]['result'], [-2.0, 2.0])
+
+class TestCalculatorSession(unittest.TestCase):
+    """Test cases for headless calculator sessions"""
+    
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+    
+    def test_structured_results(self):
+        """Test that commands return results and record them in the session history"""
+        console_output = io.StringIO()
+        session = CalculatorSession(output_dir=self.output_dir, console=Console(file=console_output))
+        
+        self.assertEqual(session.calc("2 + 3*5")["result"], 17.0)
+        self.assertEqual(session.ris(10, 5)["result"], 2)
+        self.assertEqual(session.ris_reduce("6,3,2", scan=True)["steps"], [6, 2.0, 4.0])
+        self.assertEqual(session.solve("x^2 - 4 = 0")["solution"], [-2.0, 2.0])
+        plotted = session.plot("x^2 - 4", "-5,5")
+        self.assertTrue(plotted["file"].exists())
+        with open(plotted["file"], "rb") as f:
+            self.assertEqual(f.read(4), b"\x89PNG")
+        self.assertEqual(len(ascii_plot(plotted["x_values"], plotted["y_values"])), 12)
+        
+        self.assertEqual([r["operation"] for r in session.history], ["calc", "ris", "ris_reduce", "solve", "plot"])
+        exported = session.export_history("json", os.path.join(self.output_dir, "history.json"))
+        with open(exported) as f:
+            self.assertEqual(len(json.load(f)), 5)
+        with self.assertRaises(ValueError):
+            session.export_history("xml")
+        
+        self.assertTrue(session.set_theme("dark"))
+        self.assertFalse(session.set_theme("neon"))
+        self.assertEqual(session.theme, "dark")
+        self.assertEqual(console_output.getvalue(), "")
+        
+    def test_concurrent_sessions(self):
+        """Test that sessions used from many threads keep their state apart"""
+        sessions = [CalculatorSession(theme=("default", "dark", "light")[i % 3], output_dir=self.output_dir,
+                                      headless=True) for i in range(8)]
+        errors = []
+        
+        def work(index, session):
+            try:
+                for step in range(5):
+                    session.calc(f"{index}*x + {step}")
+                    session.ris(index + step + 1, 3)
+                    session.plot(f"{index}*x^2 + {step}", (-1, 1))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=work, args=(i, session)) for i, session in enumerate(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        for index, session in enumerate(sessions):
+            self.assertEqual(len(session.history), 15)
+            self.assertEqual({r["inputs"]["expression"] for r in session.history if r["operation"] == "calc"},
+                             {f"{index}*x + {step}" for step in range(5)})
+        plot_files = [f for f in os.listdir(self.output_dir) if f.startswith("plot_")]
+        self.assertEqual(len(plot_files), 40)
+        self.assertEqual(sessions[1].theme, "dark")
 
 if __name__ == "__main__":
     unittest.main()
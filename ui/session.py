@@ -0,0 +1,341 @@
+"""
+UML Calculator Community Edition - Calculator sessions
+
+A CalculatorSession owns everything one user of the calculator changes: the
+console and its theme, the calculation history, the output directory, cached
+plot samples and the UML generator. Commands are methods that return plain
+dicts, so sessions can be used headless from services and tests, and any
+number of sessions can run side by side in one process without sharing
+mutable state or taking locks.
+"""
+import csv
+import datetime
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from rich.console import Console
+from rich.theme import Theme
+
+# Add path to core modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.ris_community import ris_explain
+from core.records import ResultLog
+from core.ris_reduce import parse_values, ris_scan
+try:
+    # Import symbolic and visualization modules if available
+    from core.symbolic import evaluate_expression, solve_equation
+    from core.visualization import create_plot
+    from core.plot_cache import PlotSampleStore
+    SYMBOLIC_AVAILABLE = True
+except ImportError:
+    SYMBOLIC_AVAILABLE = False
+
+try:
+    # Import UML generation module if available
+    from core.uml_generator import UMLGenerator, DEFAULT_NODE_BUDGET
+    UML_AVAILABLE = True
+except ImportError:
+    UML_AVAILABLE = False
+    DEFAULT_NODE_BUDGET = 150
+
+# Define UML Calculator theme
+UML_THEMES = {
+    "default": {
+        "info": "blue",
+        "warning": "yellow",
+        "danger": "red bold",
+        "success": "green",
+        "title": "blue bold",
+        "heading": "cyan bold",
+        "key": "magenta",
+        "value": "green",
+        "ris_op": "bright_green",
+        "ris_result": "bright_cyan"
+    },
+    "dark": {
+        "info": "cyan",
+        "warning": "yellow",
+        "danger": "red bold",
+        "success": "bright_green",
+        "title": "cyan bold",
+        "heading": "blue bold",
+        "key": "bright_magenta",
+        "value": "bright_green",
+        "ris_op": "green",
+        "ris_result": "cyan"
+    },
+    "light": {
+        "info": "blue",
+        "warning": "yellow",
+        "danger": "red",
+        "success": "green",
+        "title": "blue bold",
+        "heading": "cyan",
+        "key": "magenta",
+        "value": "green",
+        "ris_op": "green",
+        "ris_result": "blue"
+    }
+}
+
+EXPORT_FORMATS = ("json", "csv")
+
+class CalculatorSession:
+    """
+    State and commands for one calculator user
+    
+    Args:
+        theme: Name of a UML_THEMES entry
+        output_dir: Directory for plots and diagrams
+        console: Optional Console to print to; by default a themed console on
+            stdout, or a silent one when headless is True
+        headless: Do not print anything (commands still return results)
+    """
+    
+    def __init__(self, theme="default", output_dir="temp", console=None, headless=False):
+        if theme not in UML_THEMES:
+            raise ValueError(f"Theme '{theme}' not found. Available themes: {', '.join(UML_THEMES)}")
+        self.theme = theme
+        self.headless = headless
+        self._console_file = console.file if console is not None else None
+        self.console = console if console is not None else self._make_console()
+        self.output_dir = Path(output_dir)
+        self.history = ResultLog()
+        self.session_id = uuid.uuid4().hex[:8]
+        # Samples persist under the output directory, so CLI runs share them
+        self.plot_samples = PlotSampleStore(cache_dir=str(self.output_dir / "sample_cache")) if SYMBOLIC_AVAILABLE else None
+        self._uml_generator = None
+    
+    def _make_console(self):
+        return Console(theme=Theme(UML_THEMES[self.theme]), file=self._console_file, quiet=self.headless)
+    
+    @property
+    def uml_generator(self):
+        """UML generator writing into this session's output directory"""
+        if not UML_AVAILABLE:
+            raise ValueError("UML generation module not available in Community Edition")
+        if self._uml_generator is None:
+            self._uml_generator = UMLGenerator(str(self.output_dir / "uml"))
+        return self._uml_generator
+    
+    def set_theme(self, name):
+        """
+        Switch this session's console to another theme
+        
+        Returns:
+            True if the theme exists, False otherwise
+        """
+        if name not in UML_THEMES:
+            return False
+        self.theme = name
+        self.console = self._make_console()
+        return True
+    
+    def record(self, operation, inputs, result):
+        """Add a calculation to this session's history"""
+        self.history.append_inputs(operation, inputs, result, timestamp=time.time())
+    
+    def output_path(self, prefix, suffix):
+        """Return a new file path in the output directory that no other call can get"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        return self.output_dir / f"{prefix}_{timestamp}_{self.session_id}_{uuid.uuid4().hex[:8]}{suffix}"
+    
+    def calc(self, expression):
+        """
+        Evaluate a mathematical expression
+        
+        Returns:
+            Dict with expression and result
+        """
+        _require_symbolic("Symbolic calculation module not available in Community Edition")
+        result = evaluate_expression(expression)
+        self.record("calc", {"expression": expression}, result)
+        return {"expression": expression, "result": result}
+    
+    def ris(self, a, b):
+        """
+        Perform an RIS calculation with its explanation
+        
+        Returns:
+            Dict with a, b, result and explanation
+        """
+        result, explanation = ris_explain(a, b)
+        self.record("ris", {"a": a, "b": b}, result)
+        return {"a": a, "b": b, "result": result, "explanation": explanation}
+    
+    def ris_reduce(self, values, scan=False):
+        """
+        Reduce a sequence of integers with RIS, left to right
+        
+        Args:
+            values: String like "6,3,2,9"
+            scan: Record every intermediate result in the history
+        
+        Returns:
+            Dict with the parsed values, every prefix result and the result
+        """
+        numbers = parse_values(values)
+        steps = ris_scan(numbers)
+        self.record("ris_reduce", {"values": values}, steps if scan else steps[-1])
+        return {"values": numbers, "steps": steps, "result": steps[-1]}
+    
+    def plot(self, expression, x_range="-10,10"):
+        """
+        Plot a mathematical function to a PNG file
+        
+        Args:
+            expression: Expression in terms of x
+            x_range: "min,max" string or (min, max) tuple
+        
+        Returns:
+            Dict with expression, x_values, y_values and the plot file
+        """
+        _require_symbolic("Plotting module not available in Community Edition")
+        if isinstance(x_range, str):
+            try:
+                x_min, x_max = map(float, x_range.split(','))
+            except ValueError:
+                raise ValueError("Invalid x_range format. Use 'min,max' format.")
+        else:
+            x_min, x_max = x_range
+        
+        # Reuse samples from earlier plots of the same expression
+        x_values, y_values = self.plot_samples.sample(expression, x_min, x_max)
+        
+        plot_file = self.output_path("plot", ".png")
+        create_plot(x_values, y_values, expression, str(plot_file))
+        
+        self.record("plot", {"expression": expression, "x_range": x_range}, str(plot_file))
+        return {"expression": expression, "x_values": x_values, "y_values": y_values, "file": plot_file}
+    
+    def solve(self, equation, method="auto"):
+        """
+        Solve an equation for x
+        
+        Returns:
+            Dict with equation and solution (a value or a list of values)
+        """
+        _require_symbolic("Equation solving module not available in Community Edition")
+        solution = solve_equation(equation, method)
+        self.record("solve", {"equation": equation}, solution)
+        return {"equation": equation, "solution": solution}
+    
+    def expression_tree(self, expression, max_nodes=DEFAULT_NODE_BUDGET, pages=False, max_pages=20):
+        """
+        Generate an expression-tree diagram
+        
+        Returns:
+            Dict with node, edge, collapsed-subtree and merged-children counts,
+            the diagram files, and how many subtrees got no page because of
+            max_pages
+        """
+        generator = self.uml_generator
+        dag = generator.build_expression_dag(expression, max_nodes)
+        stats = {"skipped_subtrees": 0}
+        if pages:
+            files = generator.generate_expression_pages(expression, max_nodes, max_pages, stats)
+        else:
+            files = [generator.generate_expression_diagram(expression, max_nodes)]
+        return {
+            "expression": expression,
+            "nodes": len(dag.nodes),
+            "edges": dag.edge_count,
+            "collapsed": len(dag.collapsed),
+            "merged": sum(len(hidden) for hidden in dag.truncated.values()),
+            "files": files,
+            "skipped_subtrees": stats["skipped_subtrees"],
+        }
+    
+    def export_history(self, export_format, filename=None):
+        """
+        Export the history to JSON or CSV
+        
+        Returns:
+            Path of the written file
+        """
+        export_format = export_format.lower()
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        if not filename:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            filename = f"uml_calc_history_{timestamp}_{self.session_id}.{export_format}"
+        
+        if export_format == 'json':
+            with open(filename, 'w') as f:
+                json.dump(self.history.to_dicts(), f, indent=2, default=str)
+        else:
+            with open(filename, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['timestamp', 'operation', 'inputs', 'result'])
+                for calc in self.history:
+                    writer.writerow([
+                        calc['timestamp'],
+                        calc['operation'],
+                        json.dumps(calc['inputs']),
+                        calc['result']
+                    ])
+        return filename
+
+def _require_symbolic(message):
+    if not SYMBOLIC_AVAILABLE:
+        raise ValueError(message)
+
+def ascii_plot(x, y, width=50, height=10):
+    """
+    Render a simple ASCII plot
+    
+    Returns:
+        List of text lines: the plot rows followed by the y and x ranges
+    """
+    if len(x) < 2 or len(y) < 2:
+        raise ValueError("Not enough points to plot")
+    
+    # Filter out inf and nan values
+    valid_indices = [i for i, val in enumerate(y) if not (abs(val) == float('inf') or val != val)]
+    if not valid_indices:
+        raise ValueError("No valid points to plot")
+    
+    x_valid = [x[i] for i in valid_indices]
+    y_valid = [y[i] for i in valid_indices]
+    
+    y_min = min(y_valid)
+    y_max = max(y_valid)
+    
+    if y_min == y_max:
+        y_min -= 1
+        y_max += 1
+    
+    plot = [[' ' for _ in range(width)] for _ in range(height)]
+    
+    for i in range(len(x_valid)):
+        x_pos = int((x_valid[i] - min(x_valid)) / (max(x_valid) - min(x_valid)) * (width - 1)) if max(x_valid) != min(x_valid) else width // 2
+        y_pos = height - 1 - int((y_valid[i] - y_min) / (y_max - y_min) * (height - 1)) if y_max != y_min else height // 2
+        
+        if 0 <= x_pos < width and 0 <= y_pos < height:
+            plot[y_pos][x_pos] = '*'
+    
+    # Draw axes
+    x_axis = height - 1 - int((0 - y_min) / (y_max - y_min) * (height - 1)) if y_min < 0 < y_max else None
+    y_axis = int((0 - min(x_valid)) / (max(x_valid) - min(x_valid)) * (width - 1)) if min(x_valid) < 0 < max(x_valid) else None
+    
+    if x_axis is not None and 0 <= x_axis < height:
+        for i in range(width):
+            if plot[x_axis][i] == ' ':
+                plot[x_axis][i] = '-'
+    
+    if y_axis is not None and 0 <= y_axis < width:
+        for i in range(height):
+            if plot[i][y_axis] == ' ':
+                plot[i][y_axis] = '|'
+    
+    lines = [''.join(row) for row in plot]
+    
+    # Axes labels
+    lines.append(f"y-range: [{y_min:.2f}, {y_max:.2f}]")
+    lines.append(f"x-range: [{min(x_valid):.2f}, {max(x_valid):.2f}]")
+    return lines